@@ -0,0 +1,218 @@
+"""Linha de comando do Multipool Olímpia, para tarefas agendadas.
+
+Usa o mesmo DatabaseManager da janela sem carregar PyQt5 nem matplotlib.
+Exemplos:
+
+    python multipool_cli.py estatisticas
+    python multipool_cli.py proximos --dias 15 --formato csv
+    python multipool_cli.py exportar --formato csv --saida noturno.csv
+    python multipool_cli.py importar planilha.xlsx
+    python multipool_cli.py backup
+    python multipool_cli.py backups
+    python multipool_cli.py restaurar backup_2024-05-01_090000 restaurado.db
+    python multipool_cli.py vacuum
+
+(ou `python multipool_olimpia.py cli ...`, que também vale para o .exe).
+A saída vai para stdout em JSON (padrão) ou CSV; erros vão para stderr
+com código de saída 1.
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import sys
+
+from multipool_core import (
+    BACKUP_DIR, CAMPOS_AUDITORIA, DB_FILE, ArmazemBackups, DatabaseManager, backup_banco,
+    exportar_para_excel, importar_planilha, podar_backups,
+)
+
+CAMPOS_REGISTRO = ("id",) + CAMPOS_AUDITORIA
+
+
+def _abrir_saida(caminho):
+    if not caminho or caminho == "-":
+        return sys.stdout, False
+    return open(caminho, "w", encoding="utf-8-sig", newline=""), True
+
+
+def emitir(linhas, campos, formato, saida=None):
+    """Grava `linhas` (tuplas na ordem de `campos`) em JSON ou CSV, em streaming."""
+    arquivo, fechar = _abrir_saida(saida)
+    try:
+        if formato == "csv":
+            escritor = csv.writer(arquivo, lineterminator="\n" if not fechar else "\r\n")
+            escritor.writerow(campos)
+            escritor.writerows(linhas)
+        else:
+            arquivo.write("[")
+            for i, linha in enumerate(linhas):
+                arquivo.write(",\n " if i else "\n ")
+                json.dump(dict(zip(campos, linha)), arquivo, ensure_ascii=False, default=str)
+            arquivo.write("\n]\n")
+    finally:
+        if fechar:
+            arquivo.close()
+
+
+def emitir_objeto(objeto, formato, saida=None):
+    """Um único resultado (dict): objeto JSON ou CSV de uma linha."""
+    if formato == "csv":
+        emitir([tuple(objeto.values())], tuple(objeto), formato, saida)
+        return
+    arquivo, fechar = _abrir_saida(saida)
+    try:
+        json.dump(objeto, arquivo, ensure_ascii=False, indent=1, default=str)
+        arquivo.write("\n")
+    finally:
+        if fechar:
+            arquivo.close()
+
+
+def _data(texto):
+    try:
+        return datetime.date.fromisoformat(texto)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"data inválida (use AAAA-MM-DD): {texto}")
+
+
+def cmd_importar(db, args):
+    resultado = importar_planilha(db, args.arquivo)
+    emitir_objeto({
+        "arquivo": args.arquivo,
+        "importados": resultado.importados,
+        "duplicatas": len(resultado.duplicatas),
+        "erros": resultado.erros if args.formato == "json" else len(resultado.erros),
+    }, args.formato, args.saida)
+
+
+def cmd_exportar(db, args):
+    registros = db.iterar_registros(
+        args.ordem, args.texto,
+        args.inicio.isoformat() if args.inicio else None,
+        args.fim.isoformat() if args.fim else None,
+    )
+    if args.formato == "xlsx":
+        if args.saida:
+            raise ValueError("--saida não vale para --formato xlsx (use --nome)")
+        nome = args.nome or f"export_{datetime.datetime.now():%Y-%m-%d_%H%M%S}"
+        caminho, linhas = exportar_para_excel(registros, nome)
+        # O resumo do .xlsx gerado vai sempre em JSON para stdout
+        emitir_objeto({"arquivo": os.path.abspath(caminho), "linhas": linhas}, "json")
+    else:
+        emitir(registros, CAMPOS_REGISTRO, args.formato, args.saida)
+
+
+def cmd_estatisticas(db, args):
+    estatisticas = db.estatisticas()
+    objeto = estatisticas._asdict()
+    objeto["valor_total"] = estatisticas.valor_total
+    emitir_objeto(objeto, args.formato, args.saida)
+
+
+def cmd_proximos(db, args):
+    registros = db.proximos(args.dias, somente_disponiveis=args.disponiveis)
+    emitir(registros, registros[0]._fields if registros else (), args.formato, args.saida)
+
+
+def cmd_backup(db, args):
+    geracao = backup_banco(db.db_file, args.pasta)
+    if geracao is None:
+        raise RuntimeError(f"Banco não encontrado: {db.db_file}")
+    objeto = geracao._asdict()
+    if not args.sem_poda:
+        objeto["removidos"] = len(podar_backups(args.pasta))
+    emitir_objeto(objeto, args.formato, args.saida)
+
+
+def cmd_backups(db, args):
+    geracoes = ArmazemBackups(args.pasta).listar()
+    emitir(geracoes, geracoes[0]._fields if geracoes else (), args.formato, args.saida)
+
+
+def cmd_restaurar(db, args):
+    if os.path.exists(args.destino):
+        raise RuntimeError(f"O arquivo já existe: {args.destino}")
+    ArmazemBackups(args.pasta).restaurar(args.geracao, args.destino)
+    emitir_objeto({"geracao": args.geracao, "arquivo": os.path.abspath(args.destino)}, args.formato, args.saida)
+
+
+def cmd_vacuum(db, args):
+    antes, depois = db.compactar()
+    emitir_objeto({"bytes_antes": antes, "bytes_depois": depois}, args.formato, args.saida)
+
+
+def criar_parser():
+    parser = argparse.ArgumentParser(
+        prog="multipool_cli", description="Tarefas do Multipool Olímpia sem interface gráfica."
+    )
+    parser.add_argument("--banco", default=DB_FILE, help="arquivo SQLite (padrão: o da configuração)")
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--formato", choices=("json", "csv"), default="json", help="formato da saída")
+    comum.add_argument("--saida", help="arquivo de saída (padrão: stdout)")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("importar", parents=[comum], help="importa uma planilha .xlsx")
+    p.add_argument("arquivo")
+    p.set_defaults(executar=cmd_importar)
+
+    p = sub.add_parser(
+        "exportar", help="exporta os registros (CSV, JSON ou .xlsx)",
+        description="Exporta os registros. Em csv/json os registros vão para --saida (ou stdout); "
+                    "em xlsx a planilha é gravada em exportacoes/ e o resumo sai em JSON no stdout.",
+    )
+    p.add_argument("--formato", choices=("json", "csv", "xlsx"), default="csv",
+                   help="formato dos registros exportados (padrão: csv)")
+    p.add_argument("--saida", help="arquivo CSV/JSON dos registros (padrão: stdout; não vale para xlsx)")
+    p.add_argument("--nome", help="só no xlsx: nome do arquivo em exportacoes/ (padrão: export_<data>)")
+    p.add_argument("--ordem", choices=("ENTRADA", "COTISTA"), default="ENTRADA", type=str.upper)
+    p.add_argument("--texto", help="mesma pesquisa da barra de busca")
+    p.add_argument("--inicio", type=_data, help="entrada a partir de (AAAA-MM-DD)")
+    p.add_argument("--fim", type=_data, help="entrada até (AAAA-MM-DD)")
+    p.set_defaults(executar=cmd_exportar)
+
+    p = sub.add_parser("estatisticas", parents=[comum], help="contadores gerais")
+    p.set_defaults(executar=cmd_estatisticas)
+
+    p = sub.add_parser("proximos", parents=[comum], help="entradas dos próximos dias")
+    p.add_argument("--dias", type=int, default=7)
+    p.add_argument("--disponiveis", action="store_true", help="só os disponíveis")
+    p.set_defaults(executar=cmd_proximos)
+
+    p = sub.add_parser("backup", parents=[comum], help="nova geração de backup + retenção")
+    p.add_argument("--pasta", default=BACKUP_DIR)
+    p.add_argument("--sem-poda", action="store_true", help="não aplica a retenção")
+    p.set_defaults(executar=cmd_backup)
+
+    p = sub.add_parser("backups", parents=[comum], help="lista as gerações de backup")
+    p.add_argument("--pasta", default=BACKUP_DIR)
+    p.set_defaults(executar=cmd_backups)
+
+    p = sub.add_parser("restaurar", parents=[comum], help="remonta uma geração de backup em um arquivo .db")
+    p.add_argument("geracao", help="nome da geração (ver o comando backups)")
+    p.add_argument("destino", help="arquivo .db a criar (não pode existir)")
+    p.add_argument("--pasta", default=BACKUP_DIR)
+    p.set_defaults(executar=cmd_restaurar)
+
+    p = sub.add_parser("vacuum", parents=[comum], help="compacta e otimiza o banco")
+    p.set_defaults(executar=cmd_vacuum)
+    return parser
+
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    try:
+        db = DatabaseManager(args.banco)
+        try:
+            args.executar(db, args)
+        finally:
+            db.fechar()
+    except Exception as e:
+        print(f"Erro: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2106 @@
+"""Núcleo do Multipool Olímpia sem interface gráfica.
+
+Banco de dados (DatabaseManager), backups, logs e importação/exportação de
+planilhas. Não importa PyQt5 nem matplotlib: é usado tanto pela janela
+(multipool_olimpia.py) quanto pela linha de comando (multipool_cli.py).
+"""
+import sys
+import os
+import socket
+import getpass
+import sqlite3
+import datetime
+from collections import namedtuple
+import time
+import re
+import queue
+import threading
+import contextlib
+import hashlib
+import json
+import zlib
+import gzip
+import atexit
+
+# ---- Caminho do banco robusto para .py e .exe (PyInstaller) ----
+# CONFIG_UI_FILE will be set after resource_path is defined
+
+def ler_config_str(chave, padrao=""):
+    try:
+        if os.path.exists(CONFIG_UI_FILE):
+            with open(CONFIG_UI_FILE, "r", encoding="utf-8") as f:
+                for linha in f:
+                    if "=" in linha:
+                        k, v = linha.strip().split("=", 1)
+                        if k.strip().upper() == chave.upper():
+                            return v.strip()
+    except Exception:
+        pass
+    return padrao
+
+def app_base_dir():
+    if getattr(sys, "frozen", False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+
+
+
+# --- Connection helper for consistent PRAGMAs and timeouts (added by review) ---
+def get_conn(db_path, check_same_thread=True):
+    conn = sqlite3.connect(
+        db_path, timeout=7.0, isolation_level=None,
+        check_same_thread=check_same_thread, cached_statements=256
+    )
+    cur = conn.cursor()
+    try:
+        cur.execute("PRAGMA journal_mode=WAL;")
+    except Exception:
+        pass
+    cur.execute("PRAGMA busy_timeout=7000;")
+    cur.execute("PRAGMA synchronous=NORMAL;")
+    cur.execute("PRAGMA foreign_keys=ON;")
+    return conn
+
+def operacao_com_retry(func, max_tentativas=3):
+    """Executa uma função com retentativas progressivas em caso de 'database is locked'."""
+    for tentativa in range(max_tentativas):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e).lower() and tentativa < max_tentativas - 1:
+                time.sleep(0.5 * (tentativa + 1))  # backoff simples
+                continue
+            raise
+
+def _erro_de_conexao(erro):
+    """True se o erro indica conexão perdida (ex.: compartilhamento de rede caiu)."""
+    if isinstance(erro, sqlite3.ProgrammingError):
+        return "closed" in str(erro).lower()
+    texto = str(erro).lower()
+    return any(t in texto for t in ("disk i/o error", "unable to open database", "not a database"))
+
+class PoolConexoes:
+    """Conexões SQLite de vida longa: uma de escrita e algumas de leitura.
+
+    As PRAGMAs são aplicadas uma única vez por conexão e o cache de
+    comandos preparados fica quente entre as chamadas. Conexões paradas há
+    algum tempo são testadas antes do uso e as que falham com erro de E/S
+    são descartadas e recriadas na próxima utilização.
+    """
+
+    MAX_LEITORES = 4
+    VERIFICAR_APOS = 30  # segundos parada antes de testar a conexão
+
+    def __init__(self, db_file, max_leitores=MAX_LEITORES):
+        self.db_file = db_file
+        self._leitores = queue.LifoQueue()  # (conexão, último uso)
+        self._vagas = threading.BoundedSemaphore(max_leitores)
+        self._escritor = None
+        self._escritor_uso = 0.0
+        self._trava_escrita = threading.RLock()
+        self._profundidade = 0
+        self._fechado = False
+        self.preparar_escrita = None  # chamado com a conexão logo após o BEGIN
+
+    def _conectar(self):
+        return get_conn(self.db_file, check_same_thread=False)
+
+    def _saudavel(self, conn, ultimo_uso):
+        if time.monotonic() - ultimo_uso < self.VERIFICAR_APOS:
+            return True
+        try:
+            # Lê o cabeçalho do arquivo: falha se o caminho sumiu
+            conn.execute("PRAGMA schema_version").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    @staticmethod
+    def _fechar(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _retirar_leitor(self):
+        while True:
+            try:
+                conn, ultimo_uso = self._leitores.get_nowait()
+            except queue.Empty:
+                return self._conectar()
+            if self._saudavel(conn, ultimo_uso):
+                return conn
+            self._fechar(conn)
+
+    @contextlib.contextmanager
+    def leitura(self):
+        """Empresta uma conexão de leitura (autocommit) do pool."""
+        self._vagas.acquire()
+        try:
+            conn = self._retirar_leitor()
+            reutilizar = True
+            try:
+                yield conn
+            except sqlite3.Error as e:
+                reutilizar = not _erro_de_conexao(e)
+                raise
+            finally:
+                if reutilizar and not self._fechado:
+                    self._leitores.put((conn, time.monotonic()))
+                else:
+                    self._fechar(conn)
+        finally:
+            self._vagas.release()
+
+    @contextlib.contextmanager
+    def escrita(self):
+        """Transação de escrita (BEGIN IMMEDIATE ... COMMIT) na conexão única de escrita.
+
+        Chamadas aninhadas na mesma thread participam da transação externa.
+        """
+        with self._trava_escrita:
+            if self._profundidade:
+                self._profundidade += 1
+                try:
+                    yield self._escritor
+                finally:
+                    self._profundidade -= 1
+                return
+
+            if self._escritor is None or not self._saudavel(self._escritor, self._escritor_uso):
+                if self._escritor is not None:
+                    self._fechar(self._escritor)
+                self._escritor = self._conectar()
+            conn = self._escritor
+            self._profundidade = 1
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    if self.preparar_escrita is not None:
+                        self.preparar_escrita(conn)
+                    yield conn
+                except BaseException:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                    raise
+                conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                if _erro_de_conexao(e):
+                    self._fechar(conn)
+                    self._escritor = None
+                raise
+            finally:
+                self._profundidade = 0
+                self._escritor_uso = time.monotonic()
+
+    def verificar(self):
+        """Health check: testa as conexões paradas e descarta as quebradas."""
+        vivas = []
+        while True:
+            try:
+                conn, _ = self._leitores.get_nowait()
+            except queue.Empty:
+                break
+            if self._saudavel(conn, 0.0):
+                vivas.append(conn)
+            else:
+                self._fechar(conn)
+        for conn in vivas:
+            self._leitores.put((conn, time.monotonic()))
+        with self._trava_escrita:
+            if self._escritor is not None and not self._saudavel(self._escritor, 0.0):
+                self._fechar(self._escritor)
+                self._escritor = None
+        return len(vivas)
+
+    def fechar(self):
+        """Fecha todas as conexões (ao sair do sistema)."""
+        self._fechado = True
+        while True:
+            try:
+                conn, _ = self._leitores.get_nowait()
+            except queue.Empty:
+                break
+            self._fechar(conn)
+        with self._trava_escrita:
+            if self._escritor is not None:
+                self._fechar(self._escritor)
+                self._escritor = None
+
+def resource_path(relative_path):
+    """Retorna caminho absoluto para arquivo, mesmo no executável."""
+    if hasattr(sys, '_MEIPASS'):  # Quando rodando pelo PyInstaller
+        base_path = sys._MEIPASS
+    else:
+        base_path = app_base_dir()
+    return os.path.join(base_path, relative_path)
+
+
+LOG_DIR = "logs"
+BACKUP_DIR = "backups"
+CONFIG_DB_FILE = resource_path("db_config.txt")
+CONFIG_UI_FILE = resource_path("ui_config.txt")
+
+def ler_config_kv(path, chave, padrao=""):
+    try:
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for linha in f:
+                    if "=" in linha:
+                        k, v = linha.strip().split("=", 1)
+                        if k.strip().upper() == chave.upper():
+                            return v.strip()
+    except Exception:
+        pass
+    return padrao
+
+DB_FILE = (ler_config_kv(CONFIG_DB_FILE, "DB_PATH") or os.path.join(app_base_dir(), "dados", "multipool.db"))
+os.makedirs(os.path.join(app_base_dir(), "dados"), exist_ok=True)
+ONEDRIVE_FILE = "onedrive_path.txt"
+
+# COLLATE NOCASE do SQLite só converte A-Z
+_NOCASE = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def chave_ordenacao(registro, criterio="ENTRADA"):
+    """Chave equivalente ao ORDER BY <coluna> COLLATE NOCASE, id de buscar_ordenado."""
+    col = 1 if str(criterio).upper() == "COTISTA" else 4
+    return ((registro[col] or "").translate(_NOCASE), registro[0])
+
+def garantir_diretorio(path):
+    os.makedirs(path, exist_ok=True)
+
+def formatar_data_display(data_str):
+    if not data_str:
+        return "–"
+    for fmt in ["%Y-%m-%d", "%d/%m/%Y"]:
+        try:
+            return datetime.datetime.strptime(data_str[:10], fmt).strftime("%d/%m/%Y")
+        except ValueError:
+            pass
+    return data_str
+
+def normalizar_data(celula):
+    if isinstance(celula, (datetime.datetime, datetime.date)):
+        return celula.strftime("%Y-%m-%d")
+    if not celula:
+        return ""
+    texto = str(celula)
+    for fmt in ["%d/%m/%Y", "%Y-%m-%d"]:
+        try:
+            return datetime.datetime.strptime(texto[:10], fmt).strftime("%Y-%m-%d")
+        except:
+            pass
+    return texto
+
+# Campos cobertos pelo índice de pesquisa (registros_fts)
+CAMPOS_PESQUISA = [
+    "cotista", "contato", "empreendimento", "entrada", "saida",
+    "numero_cota", "numero_apartamento", "torre", "letra_prioridade"
+]
+_RE_DATA_BR = re.compile(r"\b(\d{1,2})/(\d{1,2})/(\d{4})\b")
+_RE_TOKEN = re.compile(r"[^\W_]+")
+
+# Versão do esquema gravada em PRAGMA user_version
+SCHEMA_VERSAO = 8
+
+# Colunas editáveis gravadas (antes/depois) na tabela auditoria
+CAMPOS_AUDITORIA = (
+    "cotista", "contato", "empreendimento", "entrada", "saida", "dormitorio", "valor",
+    "disponivel", "fonte", "numero_cota", "numero_apartamento", "torre", "letra_prioridade",
+)
+
+def _sql_data_iso(coluna):
+    """Expressão SQL: data ISO (AAAA-MM-DD) validada da coluna, ou NULL."""
+    return (
+        f"CASE WHEN date(substr({coluna}, 1, 10), '+0 days') = substr({coluna}, 1, 10) "
+        f"THEN substr({coluna}, 1, 10) END"
+    )
+
+def _sql_centavos(coluna):
+    """Expressão SQL: valor em centavos, com a mesma leitura de sempre
+    (remove 'R$', vírgula vira ponto), ou NULL se não for numérico."""
+    texto = f"TRIM(REPLACE(REPLACE({coluna}, ',', '.'), 'R$', ''))"
+    numero = f"(CASE WHEN substr({texto}, 1, 1) = '-' THEN substr({texto}, 2) ELSE {texto} END)"
+    return (
+        f"CASE WHEN {numero} GLOB '*[0-9]*' AND {numero} NOT GLOB '*[^0-9.]*' "
+        f"AND {numero} NOT GLOB '*.*.*' "
+        f"THEN CAST(ROUND(CAST({texto} AS REAL) * 100) AS INTEGER) END"
+    )
+
+def _inicio_mes_seguinte(data):
+    """Primeiro dia do mês seguinte ao de `data`."""
+    return (data.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+
+def montar_consulta_fts(texto):
+    """Converte o texto digitado numa consulta FTS5 por prefixo.
+
+    Cada palavra vira um termo com prefixo ("joao"*), todas obrigatórias.
+    Datas dd/mm/aaaa viram a frase ISO gravada no banco ("2025" "03" "15").
+    """
+    texto = _RE_DATA_BR.sub(lambda m: f"{m.group(3)}-{int(m.group(2)):02d}-{int(m.group(1)):02d}", texto or "")
+    termos = []
+    for palavra in texto.split():
+        tokens = _RE_TOKEN.findall(palavra)
+        if tokens:
+            termos.append('"' + " ".join(tokens) + '"*')
+    return " ".join(termos)
+
+_suporte_fts5 = None
+
+def sqlite_tem_fts5():
+    """True se o SQLite desta máquina tem o módulo FTS5 (testado uma vez por processo)."""
+    global _suporte_fts5
+    if _suporte_fts5 is None:
+        conn = sqlite3.connect(":memory:")
+        try:
+            conn.execute("CREATE VIRTUAL TABLE temp.teste_fts5 USING fts5(a)")
+            _suporte_fts5 = True
+        except sqlite3.OperationalError:
+            _suporte_fts5 = False
+        finally:
+            conn.close()
+    return _suporte_fts5
+
+_RE_NOME_BACKUP = re.compile(r"(backup_(\d{4}-\d{2}-\d{2}_\d{6}))\.(db|json)$")
+
+# Gerações mantidas por podar_backups: a mais recente de cada hora/dia/semana
+RETENCAO_BACKUP = {"horas": 24, "dias": 7, "semanas": 8}
+
+GeracaoBackup = namedtuple("GeracaoBackup", "nome momento tamanho blocos novos bytes_gravados")
+
+class ArmazemBackups:
+    """Backups comprimidos e deduplicados em blocos.
+
+    Cada geração é um manifesto JSON (geracoes/<nome>.json) com os hashes
+    SHA-256 dos blocos de TAMANHO_BLOCO bytes do arquivo. Cada bloco é
+    gravado uma única vez, comprimido com zlib, em blocos/<aa>/<hash>:
+    uma geração nova só grava os blocos que mudaram desde as anteriores.
+
+    A pasta é compartilhada (outros PCs, o BackupWorker, a linha de
+    comando): `guardar` e `coletar_lixo` se excluem por um arquivo de trava
+    (armazem.lock), senão a coleta apagaria blocos recém-gravados de uma
+    geração cujo manifesto ainda não foi salvo.
+    """
+
+    TAMANHO_BLOCO = 64 * 1024  # 16 páginas de 4 KiB do SQLite
+    TRAVA_EXPIRA = 10 * 60  # segundos sem renovação: trava de processo que morreu
+    TRAVA_ESPERA = 120  # segundos que guardar espera pela trava
+    CARENCIA_COLETA = 15 * 60  # blocos mais novos que isso nunca são coletados
+
+    def __init__(self, pasta=BACKUP_DIR):
+        self.pasta = pasta
+        self.pasta_geracoes = os.path.join(pasta, "geracoes")
+        self.pasta_blocos = os.path.join(pasta, "blocos")
+        self.arquivo_trava = os.path.join(pasta, "armazem.lock")
+
+    def _tentar_travar(self):
+        """Cria a trava se estiver livre (ou expirada). Retorna True se conseguiu."""
+        try:
+            fd = os.open(self.arquivo_trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(self.arquivo_trava) > self.TRAVA_EXPIRA:
+                    os.remove(self.arquivo_trava)
+            except OSError:
+                pass  # Outro processo acabou de soltar ou renovar
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"pid={os.getpid()} host={socket.gethostname()} at {datetime.datetime.now():%Y-%m-%d %H:%M:%S}")
+        return True
+
+    def _renovar_trava(self):
+        try:
+            os.utime(self.arquivo_trava)
+        except OSError:
+            pass
+
+    @contextlib.contextmanager
+    def _trava(self, espera=TRAVA_ESPERA):
+        """Exclusão entre processos/PCs; levanta TimeoutError se não conseguir em `espera` s."""
+        garantir_diretorio(self.pasta)
+        limite = time.monotonic() + espera
+        while not self._tentar_travar():
+            if time.monotonic() >= limite:
+                raise TimeoutError(f"Armazém de backups ocupado ({self.arquivo_trava})")
+            time.sleep(0.2)
+        try:
+            yield
+        finally:
+            try:
+                os.remove(self.arquivo_trava)
+            except OSError:
+                pass
+
+    def _caminho_bloco(self, hash_bloco):
+        return os.path.join(self.pasta_blocos, hash_bloco[:2], hash_bloco)
+
+    def _caminho_manifesto(self, nome):
+        return os.path.join(self.pasta_geracoes, f"{nome}.json")
+
+    def guardar(self, arquivo, nome):
+        """Guarda `arquivo` como a geração `nome`. Retorna um GeracaoBackup."""
+        garantir_diretorio(self.pasta_geracoes)
+        with self._trava():
+            return self._guardar(arquivo, nome)
+
+    def _guardar(self, arquivo, nome):
+        blocos = []
+        novos = 0
+        bytes_gravados = 0
+        hash_total = hashlib.sha256()
+        with open(arquivo, "rb") as f:
+            while True:
+                dados = f.read(self.TAMANHO_BLOCO)
+                if not dados:
+                    break
+                hash_total.update(dados)
+                hash_bloco = hashlib.sha256(dados).hexdigest()
+                caminho = self._caminho_bloco(hash_bloco)
+                if not os.path.exists(caminho):
+                    garantir_diretorio(os.path.dirname(caminho))
+                    comprimido = zlib.compress(dados, 6)
+                    with open(caminho + ".tmp", "wb") as destino:
+                        destino.write(comprimido)
+                    os.replace(caminho + ".tmp", caminho)
+                    novos += 1
+                    bytes_gravados += len(comprimido)
+                blocos.append(hash_bloco)
+                if len(blocos) % 256 == 0:
+                    self._renovar_trava()  # Arquivo grande: a trava não pode parecer abandonada
+
+        momento = datetime.datetime.now().replace(microsecond=0)
+        manifesto = {
+            "nome": nome,
+            "criado_em": momento.isoformat(),
+            "tamanho": os.path.getsize(arquivo),
+            "tamanho_bloco": self.TAMANHO_BLOCO,
+            "sha256": hash_total.hexdigest(),
+            "novos": novos,
+            "bytes_gravados": bytes_gravados,
+            "blocos": blocos,
+        }
+        caminho = self._caminho_manifesto(nome)
+        with open(caminho + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(manifesto, f)
+        os.replace(caminho + ".tmp", caminho)
+        return self._geracao(manifesto)
+
+    def _ler_manifesto(self, nome):
+        with open(self._caminho_manifesto(nome), encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def _geracao(manifesto):
+        return GeracaoBackup(
+            manifesto["nome"], datetime.datetime.fromisoformat(manifesto["criado_em"]),
+            manifesto["tamanho"], len(manifesto["blocos"]),
+            manifesto.get("novos", 0), manifesto.get("bytes_gravados", 0),
+        )
+
+    def listar(self):
+        """Gerações guardadas, da mais recente para a mais antiga."""
+        if not os.path.isdir(self.pasta_geracoes):
+            return []
+        geracoes = []
+        for arquivo in os.listdir(self.pasta_geracoes):
+            if arquivo.endswith(".json"):
+                try:
+                    geracoes.append(self._geracao(self._ler_manifesto(arquivo[:-5])))
+                except (OSError, ValueError, KeyError):
+                    continue  # Manifesto incompleto ou de outra versão
+        geracoes.sort(key=lambda g: g.momento, reverse=True)
+        return geracoes
+
+    def restaurar(self, nome, destino):
+        """Remonta a geração `nome` no arquivo `destino` e confere o SHA-256."""
+        manifesto = self._ler_manifesto(nome)
+        hash_total = hashlib.sha256()
+        temporario = destino + ".tmp"
+        try:
+            with open(temporario, "wb") as f:
+                for hash_bloco in manifesto["blocos"]:
+                    with open(self._caminho_bloco(hash_bloco), "rb") as bloco:
+                        dados = zlib.decompress(bloco.read())
+                    hash_total.update(dados)
+                    f.write(dados)
+            if hash_total.hexdigest() != manifesto["sha256"]:
+                raise ValueError(f"Geração {nome} corrompida (SHA-256 não confere)")
+        except BaseException:
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            raise
+        os.replace(temporario, destino)
+        return destino
+
+    def remover(self, nome):
+        os.remove(self._caminho_manifesto(nome))
+
+    def coletar_lixo(self):
+        """Apaga os blocos que nenhum manifesto usa. Retorna quantos.
+
+        Só roda com a trava do armazém (se outro backup está gravando, a
+        coleta fica para a próxima vez e retorna 0). Mesmo assim ignora
+        arquivos .tmp e blocos gravados há menos de CARENCIA_COLETA, caso
+        uma trava expirada tenha sido tomada de um backup ainda vivo.
+        """
+        if not os.path.isdir(self.pasta_blocos):
+            return 0
+        try:
+            with self._trava(espera=0):
+                return self._coletar_lixo()
+        except TimeoutError:
+            return 0
+
+    def _coletar_lixo(self):
+        usados = set()
+        for geracao in self.listar():
+            usados.update(self._ler_manifesto(geracao.nome)["blocos"])
+        recente = time.time() - self.CARENCIA_COLETA
+        removidos = 0
+        for prefixo in os.listdir(self.pasta_blocos):
+            pasta = os.path.join(self.pasta_blocos, prefixo)
+            for arquivo in os.listdir(pasta):
+                if arquivo in usados or arquivo.endswith(".tmp"):
+                    continue
+                caminho = os.path.join(pasta, arquivo)
+                try:
+                    if os.path.getmtime(caminho) > recente:
+                        continue
+                    os.remove(caminho)
+                except OSError:
+                    continue  # Sumiu ou está em uso em outro PC
+                removidos += 1
+        return removidos
+
+def backup_banco(origem=None, pasta=BACKUP_DIR, paginas=1024, progresso=None):
+    """Nova geração de backup do banco no ArmazemBackups de `pasta`.
+
+    A cópia usa a API de backup do SQLite, `paginas` páginas por vez, sem
+    bloquear quem grava por mais que um passo, e inclui o que ainda está
+    no -wal (ao contrário de copiar o arquivo). Ela é conferida com
+    PRAGMA quick_check antes de ir para o armazém, que só grava os blocos
+    novos. `progresso(restantes, total)` é chamado a cada passo; se
+    retornar False o backup é abandonado. Retorna o GeracaoBackup, ou None
+    se não há banco ou o backup foi cancelado.
+    """
+    origem = origem or DB_FILE
+    if not os.path.exists(origem):
+        return None
+    garantir_diretorio(pasta)
+    nome = f"backup_{datetime.datetime.now():%Y-%m-%d_%H%M%S}"
+    temporario = os.path.join(pasta, f"{nome}.db.tmp")
+
+    class _Cancelado(Exception):
+        pass
+
+    def avisar(status, restantes, total):
+        if progresso is not None and progresso(restantes, total) is False:
+            raise _Cancelado()
+
+    conn_origem = get_conn(origem)
+    conn_destino = sqlite3.connect(temporario)
+    try:
+        try:
+            try:
+                conn_origem.backup(conn_destino, pages=paginas, progress=avisar)
+            except _Cancelado:
+                return None
+            # Arquivo único e autossuficiente, sem -wal ao lado
+            conn_destino.execute("PRAGMA journal_mode=DELETE")
+            resultado = conn_destino.execute("PRAGMA quick_check").fetchone()[0]
+            if resultado != "ok":
+                raise sqlite3.DatabaseError(f"Backup inválido ({resultado})")
+        finally:
+            conn_destino.close()
+            conn_origem.close()
+        return ArmazemBackups(pasta).guardar(temporario, nome)
+    finally:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+
+def podar_backups(pasta=BACKUP_DIR, agora=None, retencao=None):
+    """Apaga as gerações de backup fora da política de retenção.
+
+    Mantém a mais recente de cada uma das últimas N horas, dias e semanas
+    (RETENCAO_BACKUP), tanto no ArmazemBackups quanto nas cópias .db
+    inteiras de versões anteriores, e depois recolhe os blocos órfãos.
+    Retorna a lista de gerações removidas.
+    """
+    retencao = retencao or RETENCAO_BACKUP
+    agora = agora or datetime.datetime.now()
+    armazem = ArmazemBackups(pasta)
+    backups = []
+    for pasta_atual in (pasta, armazem.pasta_geracoes):
+        if not os.path.isdir(pasta_atual):
+            continue
+        for arquivo in os.listdir(pasta_atual):
+            achado = _RE_NOME_BACKUP.match(arquivo)
+            if achado:
+                try:
+                    momento = datetime.datetime.strptime(achado.group(2), "%Y-%m-%d_%H%M%S")
+                except ValueError:
+                    continue
+                backups.append((momento, achado.group(1), os.path.join(pasta_atual, arquivo)))
+    backups.sort(reverse=True)
+
+    manter = set()
+    regras = (
+        (lambda m: (m.date(), m.hour), datetime.timedelta(hours=retencao["horas"])),
+        (lambda m: m.date(), datetime.timedelta(days=retencao["dias"])),
+        (lambda m: m.isocalendar()[:2], datetime.timedelta(weeks=retencao["semanas"])),
+    )
+    for balde, janela in regras:
+        vistos = set()
+        for momento, _, caminho in backups:
+            if agora - momento > janela:
+                break
+            chave = balde(momento)
+            if chave not in vistos:
+                vistos.add(chave)
+                manter.add(caminho)
+    if backups:
+        manter.add(backups[0][2])  # Nunca apagar o mais recente
+
+    removidos = []
+    for _, nome, caminho in backups:
+        if caminho not in manter:
+            try:
+                os.remove(caminho)
+                removidos.append(nome)
+            except OSError:
+                pass
+    if removidos:
+        armazem.coletar_lixo()
+    return removidos
+
+def formatar_tamanho(quantidade):
+    for unidade in ("B", "KB", "MB"):
+        if quantidade < 1024:
+            return f"{quantidade:.0f} {unidade}"
+        quantidade /= 1024
+    return f"{quantidade:.1f} GB"
+
+_RE_LOG_DIA = re.compile(r"log_(\d{4}-\d{2}-\d{2})\.jsonl$")
+
+class RegistradorLog:
+    """Log de auditoria em JSON-lines, gravado por uma thread própria.
+
+    registrar() só põe o registro numa fila; a thread grava em lotes no
+    arquivo do dia (logs/log_AAAA-MM-DD.jsonl, mantido aberto) e dá flush
+    a cada INTERVALO segundos ou quando a fila esvazia. Ao virar o dia os
+    arquivos anteriores são comprimidos (.jsonl.gz). fechar() grava o que
+    falta; é chamado ao sair.
+    """
+
+    INTERVALO = 1.0
+
+    def __init__(self, pasta=LOG_DIR):
+        self.pasta = pasta
+        self._fila = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._arquivo = None
+        self._dia = None
+        self._pendentes = []
+
+    def registrar(self, acao, dados):
+        if self._thread is None:
+            self._iniciar()
+        self._fila.put((datetime.datetime.now(), acao, dados))
+
+    def _iniciar(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, name="registrador-log", daemon=True)
+                self._thread.start()
+
+    def fechar(self, timeout=5.0):
+        """Grava os registros pendentes e encerra a thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._fila.put(None)
+            thread.join(timeout)
+
+    def _executar(self):
+        usuario = getpass.getuser()
+        host = socket.gethostname()
+        ultimo_flush = time.monotonic()
+        while True:
+            try:
+                itens = [self._fila.get(timeout=self.INTERVALO)]
+            except queue.Empty:
+                itens = []
+            while True:  # Junta no lote tudo o que já está na fila
+                try:
+                    itens.append(self._fila.get_nowait())
+                except queue.Empty:
+                    break
+            parar = None in itens
+            for item in itens:
+                if item is not None:
+                    momento, acao, dados = item
+                    self._pendentes.append((momento.date(), json.dumps({
+                        "momento": momento.isoformat(timespec="milliseconds"),
+                        "acao": acao, "dados": str(dados), "usuario": usuario, "host": host,
+                    }, ensure_ascii=False)))
+            agora = time.monotonic()
+            if self._pendentes and (parar or not itens or agora - ultimo_flush >= self.INTERVALO):
+                self._gravar()
+                ultimo_flush = agora
+            if parar:
+                if self._arquivo is not None:
+                    self._arquivo.close()
+                self._arquivo = None
+                self._dia = None
+                return
+
+    def _gravar(self):
+        gravadas = 0
+        try:
+            for dia, linha in self._pendentes:
+                if dia != self._dia:
+                    self._abrir(dia)
+                self._arquivo.write(linha + "\n")
+                gravadas += 1
+            self._arquivo.flush()
+        except OSError:
+            # Pasta indisponível (rede/OneDrive): o resto do lote fica para o próximo ciclo
+            if self._arquivo is not None:
+                with contextlib.suppress(OSError):
+                    self._arquivo.close()
+            self._arquivo = None
+            self._dia = None
+        del self._pendentes[:gravadas]
+        del self._pendentes[:-10000]  # Sem limite se a pasta sumir de vez
+
+    def _abrir(self, dia):
+        if self._arquivo is not None:
+            self._arquivo.close()
+        garantir_diretorio(self.pasta)
+        self._arquivo = open(os.path.join(self.pasta, f"log_{dia}.jsonl"), "a", encoding="utf-8")
+        self._dia = dia
+        self._rotacionar(dia)
+
+    def _rotacionar(self, hoje):
+        """Comprime os arquivos .jsonl de dias anteriores."""
+        for nome in os.listdir(self.pasta):
+            achado = _RE_LOG_DIA.match(nome)
+            if not achado or achado.group(1) >= hoje.isoformat():
+                continue
+            caminho = os.path.join(self.pasta, nome)
+            try:
+                with open(caminho, "rb") as origem, gzip.open(caminho + ".gz.tmp", "wb") as destino:
+                    while True:
+                        bloco = origem.read(1 << 20)
+                        if not bloco:
+                            break
+                        destino.write(bloco)
+                os.replace(caminho + ".gz.tmp", caminho + ".gz")
+                os.remove(caminho)
+            except OSError:
+                continue
+
+_registrador_log = RegistradorLog()
+atexit.register(_registrador_log.fechar)
+
+def registrar_log(acao, dados):
+    """Enfileira um registro de auditoria (ver RegistradorLog)."""
+    _registrador_log.registrar(acao, dados)
+
+def encerrar_log():
+    _registrador_log.fechar()
+
+EntradaLog = namedtuple("EntradaLog", "id momento acao id_registro cotista dados usuario host")
+
+_RE_ARQUIVO_LOG = re.compile(r"log_\d{4}-\d{2}-\d{2}\.(txt|jsonl)(\.gz)?$")
+_RE_LINHA_LOG_TXT = re.compile(r"\[([^\]]+)\] ([A-Z_]+): (.*)$")
+_RE_LOG_ID = re.compile(r"\bID:? (\d+)")
+_RE_LOG_COTISTA = re.compile(r"Cotista: ([^,]*)")
+
+class IndiceLogs:
+    """Índice SQLite dos arquivos de log, para o Histórico.
+
+    Para cada arquivo do dia guarda até que byte (do conteúdo descomprimido)
+    já foi indexado: atualizar() lê só o que entrou depois, e um dia que
+    virou .jsonl.gz continua de onde parou. As consultas paginam do mais
+    novo para o mais antigo e filtram por ação, cotista ou ID pelos índices,
+    sem reler os arquivos. O banco é derivado dos logs; se for apagado é
+    reconstruído.
+    """
+
+    def __init__(self, pasta=LOG_DIR):
+        self.pasta = pasta
+        garantir_diretorio(pasta)
+        self._conn = get_conn(os.path.join(pasta, "indice_logs.db"))
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS arquivos (
+                nome TEXT PRIMARY KEY,
+                posicao INTEGER NOT NULL DEFAULT 0,
+                concluido INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS entradas (
+                id INTEGER PRIMARY KEY,
+                momento TEXT NOT NULL,
+                acao TEXT,
+                id_registro INTEGER,
+                cotista TEXT COLLATE NOCASE,
+                dados TEXT,
+                usuario TEXT,
+                host TEXT,
+                arquivo TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_entradas_momento ON entradas(momento);
+            CREATE INDEX IF NOT EXISTS idx_entradas_acao ON entradas(acao, momento);
+            CREATE INDEX IF NOT EXISTS idx_entradas_registro ON entradas(id_registro, momento);
+            CREATE INDEX IF NOT EXISTS idx_entradas_cotista ON entradas(cotista);
+        """)
+
+    def fechar(self):
+        self._conn.close()
+
+    @staticmethod
+    def _interpretar(linha, arquivo):
+        if linha.startswith("{"):
+            try:
+                registro = json.loads(linha)
+            except ValueError:
+                return None
+            momento = str(registro.get("momento", "")).replace("T", " ")
+            acao, dados = registro.get("acao"), str(registro.get("dados", ""))
+            usuario, host = registro.get("usuario"), registro.get("host")
+        else:
+            achado = _RE_LINHA_LOG_TXT.match(linha)
+            if not achado:
+                return None
+            momento, acao, dados = achado.groups()
+            usuario = host = None
+        achado_id = _RE_LOG_ID.search(dados)
+        achado_cotista = _RE_LOG_COTISTA.search(dados)
+        return (
+            momento, acao, int(achado_id.group(1)) if achado_id else None,
+            achado_cotista.group(1).strip() if achado_cotista else None,
+            dados, usuario, host, arquivo,
+        )
+
+    def atualizar(self):
+        """Indexa o que entrou nos arquivos desde a última vez. Retorna quantas entradas."""
+        if not os.path.isdir(self.pasta):
+            return 0
+        estado = {nome: (posicao, concluido) for nome, posicao, concluido
+                  in self._conn.execute("SELECT nome, posicao, concluido FROM arquivos")}
+        novas = 0
+        for arquivo in sorted(os.listdir(self.pasta)):
+            achado = _RE_ARQUIVO_LOG.match(arquivo)
+            if not achado:
+                continue
+            comprimido = bool(achado.group(2))
+            nome = arquivo[:-3] if comprimido else arquivo
+            posicao, concluido = estado.get(nome, (0, 0))
+            if concluido:
+                continue
+            caminho = os.path.join(self.pasta, arquivo)
+            if not comprimido:
+                tamanho = os.path.getsize(caminho)
+                if tamanho == posicao:
+                    continue
+                if tamanho < posicao:  # Arquivo recriado: reindexa do zero
+                    self._conn.execute("DELETE FROM entradas WHERE arquivo = ?", (nome,))
+                    posicao = 0
+            try:
+                with (gzip.open if comprimido else open)(caminho, "rb") as f:
+                    f.seek(posicao)
+                    conteudo = f.read()
+            except OSError:
+                continue
+            # Só linhas completas: a última pode estar sendo gravada agora
+            fim = len(conteudo) if comprimido else conteudo.rfind(b"\n") + 1
+            linhas = conteudo[:fim].decode("utf-8", errors="replace").splitlines()
+            entradas = [e for e in (self._interpretar(linha, nome) for linha in linhas) if e]
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.executemany("""
+                    INSERT INTO entradas (momento, acao, id_registro, cotista, dados, usuario, host, arquivo)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """, entradas)
+                self._conn.execute("""
+                    INSERT INTO arquivos (nome, posicao, concluido) VALUES (?, ?, ?)
+                    ON CONFLICT (nome) DO UPDATE SET posicao = excluded.posicao, concluido = excluded.concluido
+                """, (nome, posicao + fim, int(comprimido)))
+            novas += len(entradas)
+        return novas
+
+    def pagina(self, apos=None, limite=200, acao=None, cotista=None, id_registro=None):
+        """Entradas da mais nova para a mais antiga, a partir do token `apos`.
+
+        `cotista` filtra por prefixo (sem diferenciar maiúsculas). Retorna
+        (entradas, token); token None quando acabou.
+        """
+        condicoes = []
+        params = []
+        if acao:
+            condicoes.append("acao = ?")
+            params.append(acao)
+        if id_registro is not None:
+            condicoes.append("id_registro = ?")
+            params.append(id_registro)
+        if cotista:
+            condicoes.append("cotista LIKE ? ESCAPE '\\'")
+            params.append(re.sub(r"([%_\\])", r"\\\1", cotista) + "%")
+        if apos is not None:
+            condicoes.append("momento <= ?")
+            condicoes.append("(momento, id) < (?, ?)")
+            params.extend((apos[0], apos[0], apos[1]))
+        where = (" WHERE " + " AND ".join(condicoes)) if condicoes else ""
+        linhas = self._conn.execute(
+            "SELECT id, momento, acao, id_registro, cotista, dados, usuario, host FROM entradas"
+            + where + " ORDER BY momento DESC, id DESC LIMIT ?",
+            params + [limite + 1]
+        ).fetchall()
+        token = None
+        if len(linhas) > limite:
+            del linhas[limite:]
+            token = (linhas[-1][1], linhas[-1][0])
+        return [EntradaLog(*linha) for linha in linhas], token
+
+def exportar_para_excel(dados, nome_arquivo, progresso=None):
+    """Grava as linhas em exportacoes/<nome_arquivo>.xlsx em modo write-only.
+
+    `dados` pode ser qualquer iterável de linhas (por exemplo
+    DatabaseManager.iterar_registros), consumido em streaming. A cada 500
+    linhas chama `progresso(linhas)`; se retornar False a exportação é
+    abandonada e a função retorna (None, linhas).
+    Retorna (caminho, linhas).
+    """
+    from openpyxl import Workbook  # importado só quando for usado
+
+    garantir_diretorio("exportacoes")
+    caminho = os.path.join("exportacoes", f"{nome_arquivo}.xlsx")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Datas")
+    # Cabeçalhos incluindo campos internos
+    ws.append([
+        "Cotista", "Contato", "Empreendimento", "Entrada", "Saída", "Dormitório", 
+        "Valor", "Disponível", "Fonte", "Nº da Cota", "Nº Apartamento", "Torre", 
+        "Letra de Prioridade (HBS-Royal)"
+    ])
+    linhas = 0
+    for linha in dados:
+        # Incluir todos os campos, exceto ID e timestamp
+        linha_export = linha[1:]  # Remove ID
+        if len(linha_export) > 13:  # Remove timestamp se existir
+            linha_export = linha_export[:13]
+        ws.append(list(linha_export))
+        linhas += 1
+        if progresso and linhas % 500 == 0 and progresso(linhas) is False:
+            ws.close()  # Fecha o arquivo temporário do openpyxl sem gerar o .xlsx
+            return None, linhas
+    wb.save(caminho)
+    return caminho, linhas
+
+ResultadoImportacao = namedtuple("ResultadoImportacao", "importados duplicatas erros cancelado")
+
+LinhaSerie = namedtuple("LinhaSerie", "mes empreendimento disponivel fonte quantidade valor_centavos")
+
+EventoAuditoria = namedtuple("EventoAuditoria", "momento operacao usuario host antes depois")
+
+Proximo = namedtuple(
+    "Proximo",
+    "id cotista contato empreendimento entrada dormitorio valor disponivel fonte dias",
+)
+
+class Estatisticas(namedtuple("Estatisticas", [
+    "total", "futuras", "passadas", "proximos_7_dias",
+    "disponivel_sim", "disponivel_nao",
+    "fonte_cliente", "fonte_lead", "fonte_terceiros",
+    "valor_centavos",
+])):
+    """Contadores gerais calculados no SQLite por DatabaseManager.estatisticas."""
+    __slots__ = ()
+
+    @property
+    def valor_total(self):
+        return self.valor_centavos / 100
+
+def linha_para_dados(row):
+    """Converte uma linha da planilha nos 13 campos de registros.
+
+    Retorna None para linhas vazias e levanta ValueError se faltar o cotista.
+    """
+    if not any(row[:7]):  # Pular linhas vazias
+        return None
+    row = tuple(row) + (None,) * (13 - len(row))
+
+    cotista = str(row[0]).strip() if row[0] else ""
+    contato = str(row[1]).strip() if row[1] else ""
+    empreendimento = str(row[2]).strip() if row[2] else ""
+    entrada = normalizar_data(row[3])
+    saida = normalizar_data(row[4])
+    dormitorio = str(row[5]).strip() if row[5] else ""
+    valor = str(row[6]).strip() if row[6] else ""
+
+    # Novas colunas
+    disponivel = str(row[7]).strip() if row[7] else "Sim"
+    fonte = str(row[8]).strip() if row[8] else "Cliente"
+
+    # Campos internos (opcionais no Excel)
+    numero_cota = str(row[9]).strip() if row[9] else ""
+    numero_apartamento = str(row[10]).strip() if row[10] else ""
+    torre = str(row[11]).strip() if row[11] else ""
+    letra_prioridade = str(row[12]).strip() if row[12] else ""
+
+    # Validar valores
+    if disponivel not in ["Sim", "Não"]:
+        disponivel = "Sim"
+    if fonte not in ["Cliente", "Lead Internet", "Terceiros"]:
+        fonte = "Cliente"
+
+    if not cotista:
+        raise ValueError("Campo Cotista é obrigatório")
+
+    return [cotista, contato, empreendimento, entrada, saida, dormitorio, valor, disponivel, fonte,
+            numero_cota, numero_apartamento, torre, letra_prioridade]
+
+def importar_planilha(db, arquivo, progresso=None, tamanho_lote=500):
+    """Importa um .xlsx em lotes, gravando tudo numa única transação.
+
+    A planilha é lida em modo somente leitura e validada em lotes de
+    `tamanho_lote` linhas antes de abrir a transação de escrita, que fica
+    só com os executemany. `progresso(feitas, total)` é chamado a cada lote
+    lido; se retornar False a leitura para e o que já foi lido é gravado.
+    """
+    from openpyxl import load_workbook  # importado só quando for usado
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    erros = []
+    estado = {"cancelado": False}
+    try:
+        ws = wb.active
+        total = max((ws.max_row or 1) - 1, 0)
+
+        def lotes():
+            lote = []
+            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
+                try:
+                    dados = linha_para_dados(row)
+                except Exception as e:
+                    erros.append(f"Linha {row_num}: {str(e)}")
+                    continue
+                if dados is not None:
+                    lote.append((row_num, dados))
+                if row_num % tamanho_lote == 0:
+                    yield lote
+                    lote = []
+                    if progresso and progresso(row_num - 1, total) is False:
+                        estado["cancelado"] = True
+                        return
+            if lote:
+                yield lote
+
+        lidos = list(lotes())
+    finally:
+        wb.close()
+
+    importados, duplicatas = db.inserir_em_lote(lidos)
+
+    registrar_log(
+        "IMPORTAR",
+        f"Arquivo: {os.path.basename(arquivo)}, Importados: {importados}, "
+        f"Duplicatas: {len(duplicatas)}, Erros: {len(erros)}"
+    )
+    return ResultadoImportacao(importados, duplicatas, erros, estado["cancelado"])
+
+class DatabaseManager:
+    def __init__(self, db_file):
+        self.db_file = db_file
+        # Conexões persistentes (WAL e demais PRAGMAs aplicadas uma vez por conexão)
+        self.pool = PoolConexoes(db_file)
+        self.init_db()
+        # Toda transação de escrita se identifica para os triggers de auditoria
+        self.usuario = getpass.getuser()
+        self.host = socket.gethostname()
+        self.pool.preparar_escrita = self._identificar_sessao
+
+    def _identificar_sessao(self, conn):
+        conn.execute(
+            "UPDATE auditoria_sessao SET usuario = ?, host = ? WHERE usuario IS NOT ? OR host IS NOT ?",
+            (self.usuario, self.host, self.usuario, self.host)
+        )
+
+    def fechar(self):
+        self.pool.fechar()
+
+    # Migrações numeradas: a de número N leva o esquema da versão N-1 para N
+    # (PRAGMA user_version). As já publicadas nunca mudam de efeito (a 2 só
+    # virou no-op porque a 4 desfaz o que ela fazia); alterações novas
+    # entram no fim com o número seguinte, e SCHEMA_VERSAO acompanha.
+    MIGRACOES = (
+        (1, "_migrar_esquema_inicial"),
+        (2, "_migrar_indice_agregacao"),
+        (3, "_migrar_indice_serie"),
+        (4, "_migrar_resumo_mensal"),
+        (5, "_migrar_indice_proximos"),
+        (6, "_migrar_indice_entrada_nocase"),
+        (7, "_migrar_alteracoes"),
+        (8, "_migrar_auditoria"),
+    )
+
+    def init_db(self):
+        """Leva o esquema à versão atual.
+
+        Com o banco em dia é só uma leitura (user_version e a presença do
+        índice FTS). Havendo migrações pendentes elas rodam em ordem numa
+        única transação de escrita; a versão é relida já com a trava, para
+        o caso de outro computador ter migrado o arquivo nesse meio tempo.
+
+        O índice FTS depende do SQLite de cada máquina: um banco migrado
+        num PC sem FTS5 fica sem ele, e o primeiro PC com FTS5 que abrir o
+        arquivo o cria. A pesquisa só usa FTS se a tabela existe e este
+        SQLite tem FTS5; senão usa LIKE.
+        """
+        versao, tabela_fts = self._ler_versao()
+        if versao < SCHEMA_VERSAO:
+            with self.pool.escrita() as conn:
+                versao = conn.execute("PRAGMA user_version").fetchone()[0]
+                for numero, metodo in self.MIGRACOES:
+                    if numero > versao:
+                        getattr(self, metodo)(conn)
+                        versao = numero
+                conn.execute(f"PRAGMA user_version = {versao}")
+            versao, tabela_fts = self._ler_versao()
+        suporte_fts = sqlite_tem_fts5()
+        if suporte_fts and not tabela_fts:
+            with self.pool.escrita() as conn:
+                tabela_fts = self._criar_indice_pesquisa(conn)
+        self.fts_disponivel = suporte_fts and tabela_fts
+
+    def _ler_versao(self):
+        with self.pool.leitura() as conn:
+            versao, fts = conn.execute("""
+                SELECT user_version,
+                       EXISTS (SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'registros_fts')
+                FROM pragma_user_version
+            """).fetchone()
+        return versao, bool(fts)
+
+    def _migrar_esquema_inicial(self, conn):
+        """Versão 1: tabela registros, índices básicos, pesquisa FTS5 e colunas tipadas.
+
+        Também serve para bancos anteriores ao versionamento: tudo aqui é
+        idempotente e completa o que faltar.
+        """
+        # Tabela principal
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS registros (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                cotista TEXT NOT NULL,
+                contato TEXT,
+                empreendimento TEXT,
+                entrada TEXT NOT NULL,
+                saida TEXT,
+                dormitorio TEXT,
+                valor TEXT,
+                disponivel TEXT DEFAULT 'Sim',
+                fonte TEXT DEFAULT 'Cliente',
+                numero_cota TEXT,
+                numero_apartamento TEXT,
+                torre TEXT,
+                letra_prioridade TEXT,
+                criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        # Indexes added by review for performance (separate executes)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_entrada ON registros(entrada);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_cotista ON registros(cotista COLLATE NOCASE);")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_emp ON registros(empreendimento COLLATE NOCASE);")
+        # Índice único para evitar duplicatas (cotista, entrada, empreendimento)
+        try:
+            conn.execute("""
+                CREATE UNIQUE INDEX IF NOT EXISTS ux_registros_cotista_entrada_emp
+                ON registros(cotista, entrada, COALESCE(empreendimento, ''))
+            """)
+        except Exception:
+            pass
+        # Colunas acrescentadas antes do versionamento (bancos antigos)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA table_info(registros)")
+        colunas = [coluna[1] for coluna in cursor.fetchall()]
+
+        # Colunas principais
+        if 'disponivel' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN disponivel TEXT DEFAULT 'Sim'")
+        if 'fonte' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN fonte TEXT DEFAULT 'Cliente'")
+
+        # Campos internos adicionais
+        if 'numero_cota' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN numero_cota TEXT")
+        if 'numero_apartamento' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN numero_apartamento TEXT")
+        if 'torre' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN torre TEXT")
+        if 'letra_prioridade' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN letra_prioridade TEXT")
+
+        # Índice de pesquisa (FTS5) mantido por triggers
+        self._criar_indice_pesquisa(conn)
+        self._migrar_colunas_tipadas(conn)
+
+    def _migrar_indice_agregacao(self, conn):
+        """Versão 2: só marca o número.
+
+        Ela criava idx_registros_agregacao, que a versão 4 remove em favor de
+        resumo_mensal; criá-lo aqui só para apagá-lo duas migrações depois
+        custaria um índice completo em toda base que ainda passa por ela.
+        Bancos que já estão na 2 ou na 3 têm o índice e a 4 o remove.
+        """
+
+    def _migrar_indice_serie(self, conn):
+        """Versão 3: índice de cobertura por faixa de entrada para serie_mensal."""
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_registros_serie
+            ON registros(entrada_data, empreendimento, disponivel, fonte, valor_centavos)
+        """)
+
+    def _migrar_indice_proximos(self, conn):
+        """Versão 5: índice parcial para proximos(somente_disponiveis=True)."""
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_registros_proximos
+            ON registros(entrada_data) WHERE COALESCE(disponivel, 'Sim') = 'Sim'
+        """)
+
+    def _migrar_indice_entrada_nocase(self, conn):
+        """Versão 6: mesma colação do ORDER BY, para a paginação keyset por data."""
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_registros_entrada_nocase
+            ON registros(entrada COLLATE NOCASE)
+        """)
+
+    def _migrar_auditoria(self, conn):
+        """Versão 8: histórico de alterações por registro (tabela auditoria).
+
+        Triggers gravam, para cada inserção, alteração efetiva ou exclusão,
+        os valores antes/depois em JSON. Usuário e host vêm da linha única de
+        auditoria_sessao, que cada transação de escrita do DatabaseManager
+        atualiza antes de gravar (ver _identificar_sessao).
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS auditoria (
+                id INTEGER PRIMARY KEY,
+                id_registro INTEGER NOT NULL,
+                momento TEXT NOT NULL,
+                operacao TEXT NOT NULL,
+                usuario TEXT,
+                host TEXT,
+                antes TEXT,
+                depois TEXT
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_auditoria_registro ON auditoria(id_registro, momento)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS auditoria_sessao (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                usuario TEXT,
+                host TEXT
+            )
+        """)
+        conn.execute("INSERT OR IGNORE INTO auditoria_sessao (id) VALUES (1)")
+
+        def valores(r):
+            return "json_object(" + ", ".join(f"'{c}', {r}.{c}" for c in CAMPOS_AUDITORIA) + ")"
+
+        def registrar(operacao, id_expr, antes, depois):
+            return f"""
+                INSERT INTO auditoria (id_registro, momento, operacao, usuario, host, antes, depois)
+                SELECT {id_expr}, strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'), '{operacao}',
+                       usuario, host, {antes}, {depois}
+                FROM auditoria_sessao WHERE id = 1;
+            """
+
+        mudou = " OR ".join(f"old.{c} IS NOT new.{c}" for c in CAMPOS_AUDITORIA)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS auditoria_ai AFTER INSERT ON registros BEGIN
+                {registrar('INSERIR', 'new.id', 'NULL', valores('new'))}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS auditoria_au
+            AFTER UPDATE OF {", ".join(CAMPOS_AUDITORIA)} ON registros
+            WHEN {mudou} BEGIN
+                {registrar('ATUALIZAR', 'new.id', valores('old'), valores('new'))}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS auditoria_ad AFTER DELETE ON registros BEGIN
+                {registrar('EXCLUIR', 'old.id', valores('old'), 'NULL')}
+            END
+        """)
+
+    def _migrar_alteracoes(self, conn):
+        """Versão 7: sequência de alterações para os PCs em modo leitura.
+
+        Uma linha por registro tocado (inclusive excluídos) com o número de
+        sequência da última gravação; quem observa pede só o que passou do
+        último número que já aplicou.
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS alteracoes (
+                id_registro INTEGER PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_alteracoes_seq ON alteracoes(seq)")
+
+        def marcar(r):
+            return f"""
+                INSERT INTO alteracoes (id_registro, seq)
+                VALUES ({r}.id, (SELECT COALESCE(MAX(seq), 0) + 1 FROM alteracoes))
+                ON CONFLICT (id_registro) DO UPDATE SET seq = excluded.seq;
+            """
+
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS alteracoes_ai AFTER INSERT ON registros BEGIN
+                {marcar('new')}
+            END
+        """)
+        # Só colunas editáveis: as derivadas (entrada_data etc.) mudam junto com elas
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS alteracoes_au
+            AFTER UPDATE OF cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+            ON registros BEGIN
+                {marcar('new')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS alteracoes_ad AFTER DELETE ON registros BEGIN
+                {marcar('old')}
+            END
+        """)
+
+    def _migrar_resumo_mensal(self, conn):
+        """Versão 4: tabela de resumo mensal mantida por triggers.
+
+        resumo_mensal guarda quantidade e soma de valor_centavos por
+        (mês, empreendimento, disponível, fonte) só dos registros com
+        entrada_data válida. Chaves nulas viram '' para caber na chave primária.
+        """
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS resumo_mensal (
+                mes TEXT NOT NULL,
+                empreendimento TEXT NOT NULL DEFAULT '',
+                disponivel TEXT NOT NULL DEFAULT '',
+                fonte TEXT NOT NULL DEFAULT '',
+                quantidade INTEGER NOT NULL DEFAULT 0,
+                valor_centavos INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (mes, empreendimento, disponivel, fonte)
+            ) WITHOUT ROWID
+        """)
+
+        def somar(r):
+            return f"""
+                INSERT INTO resumo_mensal (mes, empreendimento, disponivel, fonte, quantidade, valor_centavos)
+                SELECT substr({r}.entrada_data, 1, 7), COALESCE({r}.empreendimento, ''),
+                       COALESCE({r}.disponivel, ''), COALESCE({r}.fonte, ''), 1, COALESCE({r}.valor_centavos, 0)
+                WHERE {r}.entrada_data IS NOT NULL
+                ON CONFLICT (mes, empreendimento, disponivel, fonte) DO UPDATE SET
+                    quantidade = quantidade + excluded.quantidade,
+                    valor_centavos = valor_centavos + excluded.valor_centavos;
+            """
+
+        def subtrair(r):
+            chave = (
+                f"mes = substr({r}.entrada_data, 1, 7) AND empreendimento = COALESCE({r}.empreendimento, '') "
+                f"AND disponivel = COALESCE({r}.disponivel, '') AND fonte = COALESCE({r}.fonte, '')"
+            )
+            return f"""
+                UPDATE resumo_mensal SET
+                    quantidade = quantidade - 1,
+                    valor_centavos = valor_centavos - COALESCE({r}.valor_centavos, 0)
+                WHERE {chave};
+                DELETE FROM resumo_mensal WHERE {chave} AND quantidade <= 0;
+            """
+
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS resumo_mensal_ai AFTER INSERT ON registros BEGIN
+                {somar('new')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS resumo_mensal_ad AFTER DELETE ON registros BEGIN
+                {subtrair('old')}
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS resumo_mensal_au
+            AFTER UPDATE OF entrada_data, empreendimento, disponivel, fonte, valor_centavos ON registros BEGIN
+                {subtrair('old')}
+                {somar('new')}
+            END
+        """)
+        # O resumo substitui o índice de cobertura das estatísticas
+        conn.execute("DROP INDEX IF EXISTS idx_registros_agregacao")
+        self._reconstruir_resumo(conn)
+
+    def _reconstruir_resumo(self, conn):
+        conn.execute("DELETE FROM resumo_mensal")
+        conn.execute("""
+            INSERT INTO resumo_mensal (mes, empreendimento, disponivel, fonte, quantidade, valor_centavos)
+            SELECT substr(entrada_data, 1, 7), COALESCE(empreendimento, ''), COALESCE(disponivel, ''),
+                   COALESCE(fonte, ''), COUNT(*), COALESCE(SUM(valor_centavos), 0)
+            FROM registros
+            WHERE entrada_data IS NOT NULL
+            GROUP BY 1, 2, 3, 4
+        """)
+
+    def reconstruir_resumo(self):
+        """Recalcula resumo_mensal do zero (reparo). Retorna a quantidade de grupos."""
+        with self.pool.escrita() as conn:
+            self._reconstruir_resumo(conn)
+            grupos = conn.execute("SELECT COUNT(*) FROM resumo_mensal").fetchone()[0]
+        registrar_log("RESUMO", f"Resumo mensal reconstruído: {grupos} grupos")
+        return grupos
+
+    def compactar(self):
+        """VACUUM + PRAGMA optimize numa conexão avulsa (VACUUM não roda em transação).
+
+        Retorna (bytes antes, bytes depois).
+        """
+        antes = os.path.getsize(self.db_file)
+        conn = get_conn(self.db_file)
+        try:
+            conn.execute("VACUUM")
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            conn.execute("PRAGMA optimize")
+        finally:
+            conn.close()
+        depois = os.path.getsize(self.db_file)
+        registrar_log("VACUUM", f"Banco compactado: {antes} -> {depois} bytes")
+        return antes, depois
+
+    def _migrar_colunas_tipadas(self, conn):
+        """Versão 1: colunas normalizadas para agregações.
+
+        valor_centavos (INTEGER) e entrada_data/saida_data (ISO validada ou
+        NULL) são preenchidas uma vez aqui e mantidas por triggers em toda
+        escrita, para que estatísticas e gráficos não reinterpretem texto.
+        """
+        colunas = [c[1] for c in conn.execute("PRAGMA table_info(registros)").fetchall()]
+        if 'valor_centavos' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN valor_centavos INTEGER")
+        if 'entrada_data' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN entrada_data TEXT")
+        if 'saida_data' not in colunas:
+            conn.execute("ALTER TABLE registros ADD COLUMN saida_data TEXT")
+
+        derivadas = (
+            f"valor_centavos = {_sql_centavos('valor')}, "
+            f"entrada_data = {_sql_data_iso('entrada')}, "
+            f"saida_data = {_sql_data_iso('saida')}"
+        )
+        conn.execute(f"UPDATE registros SET {derivadas}")
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS registros_tipos_ai AFTER INSERT ON registros BEGIN
+                UPDATE registros SET {derivadas} WHERE id = new.id;
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS registros_tipos_au AFTER UPDATE OF valor, entrada, saida ON registros BEGIN
+                UPDATE registros SET {derivadas} WHERE id = new.id;
+            END
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_entrada_data ON registros(entrada_data);")
+
+    def _criar_indice_pesquisa(self, conn):
+        """Cria o índice FTS5 (external content) sobre registros e seus triggers.
+
+        Retorna False se o SQLite desta máquina não tiver FTS5; nesse caso
+        pesquisar() usa LIKE.
+        """
+        existe = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name='registros_fts'"
+        ).fetchone()
+        campos = ", ".join(CAMPOS_PESQUISA)
+        novos = ", ".join(f"new.{c}" for c in CAMPOS_PESQUISA)
+        antigos = ", ".join(f"old.{c}" for c in CAMPOS_PESQUISA)
+        try:
+            conn.execute(f"""
+                CREATE VIRTUAL TABLE IF NOT EXISTS registros_fts USING fts5(
+                    {campos},
+                    content='registros', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError:
+            return False
+
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS registros_fts_ai AFTER INSERT ON registros BEGIN
+                INSERT INTO registros_fts(rowid, {campos}) VALUES (new.id, {novos});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS registros_fts_ad AFTER DELETE ON registros BEGIN
+                INSERT INTO registros_fts(registros_fts, rowid, {campos}) VALUES ('delete', old.id, {antigos});
+            END
+        """)
+        conn.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS registros_fts_au AFTER UPDATE OF {campos} ON registros BEGIN
+                INSERT INTO registros_fts(registros_fts, rowid, {campos}) VALUES ('delete', old.id, {antigos});
+                INSERT INTO registros_fts(rowid, {campos}) VALUES (new.id, {novos});
+            END
+        """)
+        if not existe:
+            # Primeira vez: indexar o que já está na tabela
+            conn.execute("INSERT INTO registros_fts(registros_fts) VALUES ('rebuild')")
+        return True
+
+    def inserir(self, dados):
+        # Garantir que temos 13 elementos (incluindo todos os campos)
+        while len(dados) < 13:
+            if len(dados) == 7:
+                dados.append("Sim")  # disponivel
+            elif len(dados) == 8:
+                dados.append("Cliente")  # fonte
+            elif len(dados) == 9:
+                dados.append("")  # numero_cota
+            elif len(dados) == 10:
+                dados.append("")  # numero_apartamento
+            elif len(dados) == 11:
+                dados.append("")  # torre
+            elif len(dados) == 12:
+                dados.append("")  # letra_prioridade
+
+        with self.pool.escrita() as conn:
+            cur = conn.execute("""
+                INSERT INTO registros (cotista, contato, empreendimento, entrada, saida, dormitorio, valor, disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, dados)
+            registrar_log("INSERIR", f"Cotista: {dados[0]}, Entrada: {dados[3]}")
+            # Devolve a linha gravada para a interface aplicar só ela
+            return self._linha_por_id(conn, cur.lastrowid)
+
+    def inserir_em_lote(self, lotes):
+        """Grava lotes [(linha, dados), ...] numa única transação com executemany.
+
+        Duplicatas (cotista + entrada + empreendimento) já existentes no banco
+        são identificadas em bloco por lote e as repetidas dentro da própria
+        entrada são puladas; o ON CONFLICT sobre ux_registros_cotista_entrada_emp
+        garante que nada duplicado passe. Retorna (inseridos, duplicatas), com
+        duplicatas = [(linha, dados), ...].
+        """
+        inseridos = 0
+        duplicatas = []
+        vistos = set()
+        with self.pool.escrita() as conn:
+            conn.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS importacao_chaves (
+                    linha INTEGER PRIMARY KEY, cotista TEXT, entrada TEXT, empreendimento TEXT
+                )
+            """)
+            for lote in lotes:
+                if not lote:
+                    continue
+                conn.execute("DELETE FROM importacao_chaves")
+                conn.executemany(
+                    "INSERT INTO importacao_chaves VALUES (?, ?, ?, ?)",
+                    [(linha, d[0], d[3], d[2] or '') for linha, d in lote]
+                )
+                existentes = {linha for (linha,) in conn.execute("""
+                    SELECT k.linha FROM importacao_chaves k
+                    WHERE EXISTS (
+                        SELECT 1 FROM registros r
+                        WHERE r.cotista = k.cotista AND r.entrada = k.entrada
+                          AND COALESCE(r.empreendimento, '') = k.empreendimento
+                    )
+                """)}
+
+                novos = []
+                for linha, dados in lote:
+                    chave = (dados[0], dados[3], dados[2] or '')
+                    if linha in existentes or chave in vistos:
+                        duplicatas.append((linha, dados))
+                        continue
+                    vistos.add(chave)
+                    novos.append(dados)
+
+                cur = conn.executemany("""
+                    INSERT INTO registros (cotista, contato, empreendimento, entrada, saida, dormitorio, valor, disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT DO NOTHING
+                """, novos)
+                inseridos += cur.rowcount
+            conn.execute("DELETE FROM importacao_chaves")
+        return inseridos, duplicatas
+
+    def _filtro_registros(self, texto=None, inicio=None, fim=None):
+        """Monta o WHERE (e parâmetros) para pesquisa e/ou período de entrada."""
+        condicoes = []
+        params = []
+        if texto and texto.strip():
+            if self.fts_disponivel:
+                condicoes.append("id IN (SELECT rowid FROM registros_fts WHERE registros_fts MATCH ?)")
+                params.append(montar_consulta_fts(texto) or '""')
+            else:
+                condicoes.append("(" + " OR ".join(f"{c} LIKE ?" for c in CAMPOS_PESQUISA) + ")")
+                params.extend([f"%{texto.strip()}%"] * len(CAMPOS_PESQUISA))
+        if inicio:
+            condicoes.append("entrada >= ?")
+            params.append(str(inicio))
+        if fim:
+            # Entrada até o fim do dia `fim` (usa idx_registros_entrada)
+            condicoes.append("entrada < ?")
+            params.append((datetime.date.fromisoformat(str(fim)) + datetime.timedelta(days=1)).isoformat())
+        return (" WHERE " + " AND ".join(condicoes)) if condicoes else "", params
+
+    def contar(self, texto=None, inicio=None, fim=None):
+        """Quantidade de registros que iterar_registros devolveria."""
+        where, params = self._filtro_registros(texto, inicio, fim)
+        with self.pool.leitura() as conn:
+            return conn.execute("SELECT COUNT(*) FROM registros" + where, params).fetchone()[0]
+
+    def iterar_registros(self, criterio="ENTRADA", texto=None, inicio=None, fim=None, lote=500):
+        """Gera os registros em streaming (fetchmany) sem materializar a tabela.
+
+        Aceita o texto da pesquisa e/ou um período de entrada (datas ISO).
+        A conexão de leitura fica emprestada até o gerador terminar ou ser fechado.
+        """
+        allowed = {"ENTRADA": "entrada", "COTISTA": "cotista"}
+        col = allowed.get(str(criterio).upper(), "entrada")
+        where, params = self._filtro_registros(texto, inicio, fim)
+        with self.pool.leitura() as conn:
+            cursor = conn.execute(
+                """
+                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                        disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+                FROM registros""" + where + " ORDER BY " + col + " COLLATE NOCASE, id",
+                params
+            )
+            try:
+                while True:
+                    linhas = cursor.fetchmany(lote)
+                    if not linhas:
+                        break
+                    yield from linhas
+            finally:
+                cursor.close()
+
+    def proximos(self, dias=7, hoje=None, somente_disponiveis=False):
+        """Registros com entrada entre `hoje` e `hoje + dias`, mais próximos primeiro.
+
+        Consulta por faixa em entrada_data (idx_registros_entrada_data, ou o
+        índice parcial idx_registros_proximos com `somente_disponiveis`),
+        lendo só as colunas do alerta. Retorna uma lista de Proximo, com
+        `entrada` em ISO e `dias` a partir de `hoje`.
+        """
+        hoje = hoje or datetime.date.today()
+        fim = hoje + datetime.timedelta(days=dias)
+        filtro = " AND COALESCE(disponivel, 'Sim') = 'Sim'" if somente_disponiveis else ""
+        with self.pool.leitura() as conn:
+            cursor = conn.execute(
+                """
+                SELECT id, cotista, contato, empreendimento, entrada_data, dormitorio, valor,
+                       COALESCE(disponivel, 'Sim'), COALESCE(fonte, 'Cliente'),
+                       CAST(julianday(entrada_data) - julianday(?) AS INTEGER)
+                FROM registros
+                WHERE entrada_data BETWEEN ? AND ?""" + filtro + """
+                ORDER BY entrada_data, id
+                """,
+                (hoje.isoformat(), hoje.isoformat(), fim.isoformat())
+            )
+            return [Proximo(*row) for row in cursor]
+
+    def estatisticas(self, hoje=None):
+        """Calcula os contadores do diálogo de estatísticas no SQLite.
+
+        Disponível/fonte/valor vêm de resumo_mensal (custo proporcional ao
+        número de meses); futuras e próximos 7 dias são contados por faixa
+        em idx_registros_entrada_data. Registros sem data de entrada válida
+        contam só como passados, como sempre foi no diálogo.
+        Retorna um Estatisticas.
+        """
+        hoje = hoje or datetime.date.today()
+        params = {
+            "hoje": hoje.isoformat(),
+            "limite": (hoje + datetime.timedelta(days=7)).isoformat(),
+        }
+        disponivel_sim = disponivel_nao = 0
+        fonte_cliente = fonte_lead = fonte_terceiros = 0
+        valor_centavos = 0
+        with self.pool.leitura() as conn:
+            total, futuras, proximos_7_dias = conn.execute("""
+                SELECT
+                    (SELECT COUNT(*) FROM registros),
+                    (SELECT COUNT(*) FROM registros WHERE entrada_data >= :hoje),
+                    (SELECT COUNT(*) FROM registros WHERE entrada_data BETWEEN :hoje AND :limite)
+            """, params).fetchone()
+            grupos = conn.execute("""
+                SELECT disponivel, fonte, SUM(quantidade), SUM(valor_centavos)
+                FROM resumo_mensal
+                GROUP BY disponivel, fonte
+            """).fetchall()
+
+        for disponivel, fonte, quantidade, centavos in grupos:
+            if (disponivel or "Sim") == "Sim":
+                disponivel_sim += quantidade
+            else:
+                disponivel_nao += quantidade
+            fonte = fonte or "Cliente"
+            if fonte == "Cliente":
+                fonte_cliente += quantidade
+            elif fonte == "Lead Internet":
+                fonte_lead += quantidade
+            else:
+                fonte_terceiros += quantidade
+            valor_centavos += centavos or 0
+
+        return Estatisticas(
+            total, futuras, total - futuras, proximos_7_dias,
+            disponivel_sim, disponivel_nao,
+            fonte_cliente, fonte_lead, fonte_terceiros,
+            valor_centavos,
+        )
+
+    def serie_mensal(self, inicio, fim, empreendimento=None):
+        """Série mensal pré-agregada para a Contabilidade.
+
+        Os meses inteiros dentro de [inicio, fim] (datas ISO, inclusivas) são
+        lidos de resumo_mensal; só os meses das pontas, quando parciais, são
+        agregados a partir de registros por faixa de entrada_data
+        (idx_registros_serie). O filtro de empreendimento (trecho, sem
+        diferenciar maiúsculas) é aplicado nos grupos, que são poucos.
+        Retorna uma lista de LinhaSerie.
+        """
+        inicio = datetime.date.fromisoformat(str(inicio)[:10])
+        fim = datetime.date.fromisoformat(str(fim)[:10])
+        if fim < inicio:
+            return []
+
+        # Meses inteiros: do 1º mês que começa em/após `inicio` ao último que termina até `fim`
+        primeiro = inicio if inicio.day == 1 else _inicio_mes_seguinte(inicio)
+        seguinte = _inicio_mes_seguinte(fim)
+        depois_ultimo = seguinte if seguinte - fim == datetime.timedelta(days=1) else fim.replace(day=1)
+
+        grupos = []
+        with self.pool.leitura() as conn:
+            if primeiro < depois_ultimo:
+                grupos += conn.execute("""
+                    SELECT mes, empreendimento, disponivel, fonte, quantidade, valor_centavos
+                    FROM resumo_mensal
+                    WHERE mes >= ? AND mes < ?
+                """, (primeiro.isoformat()[:7], depois_ultimo.isoformat()[:7])).fetchall()
+                faixas = [(inicio, primeiro - datetime.timedelta(days=1)), (depois_ultimo, fim)]
+            else:
+                faixas = [(inicio, fim)]
+
+            for de, ate in faixas:
+                if de > ate:
+                    continue
+                grupos += conn.execute("""
+                    SELECT substr(entrada_data, 1, 7) AS mes, empreendimento, disponivel, fonte,
+                           COUNT(*), SUM(valor_centavos)
+                    FROM registros
+                    WHERE entrada_data BETWEEN ? AND ?
+                    GROUP BY mes, empreendimento, disponivel, fonte
+                """, (de.isoformat(), ate.isoformat())).fetchall()
+
+        filtro = (empreendimento or "").strip().lower()
+        return [
+            LinhaSerie(mes, emp, disp, fonte, quantidade, centavos or 0)
+            for mes, emp, disp, fonte, quantidade, centavos in grupos
+            if not filtro or filtro in (emp or "").lower()
+        ]
+
+    def buscar_ordenado(self, criterio="ENTRADA"):
+        allowed = {"ENTRADA": "entrada", "COTISTA": "cotista"}
+        col = allowed.get(str(criterio).upper(), "entrada")
+        with self.pool.leitura() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                        disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+                FROM registros
+                ORDER BY """ + col + " COLLATE NOCASE, id"
+            )
+            return cursor.fetchall()
+    def atualizar(self, id_registro, dados):
+        # Garantir que temos 13 elementos
+        while len(dados) < 13:
+            if len(dados) == 7:
+                dados.append("Sim")
+            elif len(dados) == 8:
+                dados.append("Cliente")
+            elif len(dados) == 9:
+                dados.append("")
+            elif len(dados) == 10:
+                dados.append("")
+            elif len(dados) == 11:
+                dados.append("")
+            elif len(dados) == 12:
+                dados.append("")
+
+        with self.pool.escrita() as conn:
+            cur = conn.execute("""
+                UPDATE registros 
+                SET cotista=?, contato=?, empreendimento=?, entrada=?, saida=?, dormitorio=?, valor=?, disponivel=?, fonte=?, numero_cota=?, numero_apartamento=?, torre=?, letra_prioridade=?
+                WHERE id=?
+            """, dados + [id_registro])
+            registrar_log("ATUALIZAR", f"ID: {id_registro}, Cotista: {dados[0]}")
+            if cur.rowcount == 0:
+                return None
+            return self._linha_por_id(conn, id_registro)
+
+    def _linha_por_id(self, conn, id_registro):
+        # Buscar apenas os campos necessários, excluindo o timestamp
+        cursor = conn.execute("""
+            SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor, 
+                    disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+            FROM registros WHERE id=?
+        """, (id_registro,))
+        return cursor.fetchone()
+
+    def historico(self, id_registro):
+        """Alterações do registro, da mais recente para a mais antiga.
+
+        Retorna uma lista de EventoAuditoria com `antes`/`depois` como dict
+        (None na inserção/exclusão, respectivamente).
+        """
+        with self.pool.leitura() as conn:
+            linhas = conn.execute("""
+                SELECT momento, operacao, usuario, host, antes, depois
+                FROM auditoria
+                WHERE id_registro = ?
+                ORDER BY momento DESC, id DESC
+            """, (id_registro,)).fetchall()
+        return [
+            EventoAuditoria(momento, operacao, usuario, host,
+                            json.loads(antes) if antes else None,
+                            json.loads(depois) if depois else None)
+            for momento, operacao, usuario, host, antes, depois in linhas
+        ]
+
+    def ultima_alteracao(self):
+        """Número de sequência da gravação mais recente (0 se nenhuma)."""
+        with self.pool.leitura() as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+
+    def alteracoes_desde(self, seq, limite=500):
+        """Registros gravados depois da sequência `seq`.
+
+        Retorna (ultimo_seq, alterados, excluidos): as linhas atuais dos
+        registros inseridos/atualizados e os ids dos excluídos. Com mais de
+        `limite` alterações, alterados e excluidos vêm None (vale recarregar).
+        """
+        with self.pool.leitura() as conn:
+            # Uma única consulta: sequência e linhas saem do mesmo instantâneo
+            linhas = conn.execute("""
+                SELECT a.seq, a.id_registro, r.id, r.cotista, r.contato, r.empreendimento, r.entrada,
+                       r.saida, r.dormitorio, r.valor, r.disponivel, r.fonte, r.numero_cota,
+                       r.numero_apartamento, r.torre, r.letra_prioridade
+                FROM alteracoes a LEFT JOIN registros r ON r.id = a.id_registro
+                WHERE a.seq > ?
+                ORDER BY a.seq
+                LIMIT ?
+            """, (seq, limite + 1)).fetchall()
+            if len(linhas) > limite:
+                ultimo = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM alteracoes").fetchone()[0]
+                return ultimo, None, None
+        if not linhas:
+            return seq, [], []
+        alterados = [linha[2:] for linha in linhas if linha[2] is not None]
+        excluidos = [linha[1] for linha in linhas if linha[2] is None]
+        return linhas[-1][0], alterados, excluidos
+
+    def buscar_por_id(self, id_registro):
+        with self.pool.leitura() as conn:
+            return self._linha_por_id(conn, id_registro)
+
+    def existe_duplicata(self, cotista, entrada, empreendimento):
+        with self.pool.leitura() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT COUNT(*) FROM registros 
+                WHERE cotista=? AND entrada=? AND COALESCE(empreendimento, '')=?
+                """,
+                (cotista, entrada, empreendimento or '')
+            )
+            return cursor.fetchone()[0] > 0
+
+        
+    def buscar_pagina(self, criterio="ENTRADA", apos=None, limite=200, periodo=None, hoje=None,
+                      decrescente=False):
+        """Página de registros por keyset, na ordem de buscar_ordenado.
+
+        `apos` é o token devolvido pela página anterior (chave e id da última
+        linha): a consulta começa direto nesse ponto do índice em vez de pular
+        linhas com OFFSET, então a página 1000 custa o mesmo que a primeira.
+        `periodo` "FUTURO"/"PASSADO" restringe às entradas válidas a partir
+        de / antes de `hoje` (faixa no índice da entrada); `decrescente`
+        inverte a ordem. Retorna (registros, token); token None no fim.
+        """
+        allowed = {"ENTRADA": "entrada", "COTISTA": "cotista"}
+        col = allowed.get(str(criterio).upper(), "entrada")
+        hoje = str(hoje or datetime.date.today().isoformat())
+        condicoes = []
+        params = []
+        periodo = str(periodo or "").upper()
+        if periodo == "FUTURO":
+            condicoes.append("entrada_data >= ?")
+            params.append(hoje)
+            if col == "entrada":
+                # Redundante com entrada_data, mas deixa o índice buscar a faixa
+                condicoes.append("entrada COLLATE NOCASE >= ?")
+                params.append(hoje)
+        elif periodo == "PASSADO":
+            condicoes.append("entrada_data < ?")
+            params.append(hoje)
+            if col == "entrada":
+                condicoes.append("entrada COLLATE NOCASE < ?")
+                params.append(hoje)
+        if apos is not None:
+            chave, ultimo_id = apos
+            # O limite simples na chave é o que posiciona o índice; a tupla desempata pelo id
+            op = "<" if decrescente else ">"
+            condicoes.append(f"{col} COLLATE NOCASE {op}= ?")
+            condicoes.append(f"({col} COLLATE NOCASE, id) {op} (?, ?)")
+            params.extend((chave, chave, ultimo_id))
+        where = (" WHERE " + " AND ".join(condicoes)) if condicoes else ""
+        direcao = " DESC" if decrescente else ""
+        with self.pool.leitura() as conn:
+            registros = conn.execute(
+                """
+                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                        disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+                FROM registros""" + where + f" ORDER BY {col} COLLATE NOCASE{direcao}, id{direcao} LIMIT ?",
+                params + [limite + 1]
+            ).fetchall()
+        token = None
+        if len(registros) > limite:
+            del registros[limite:]
+            ultimo = registros[-1]
+            token = (ultimo[1 if col == "cotista" else 4], ultimo[0])
+        return registros, token
+
+    def datas_invalidas(self, limite=None):
+        """Registros cuja entrada não é uma data válida (entrada_data NULL).
+
+        Não aparecem nas abas de futuras/passadas; listados para correção.
+        """
+        with self.pool.leitura() as conn:
+            return conn.execute(
+                """
+                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                        disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+                FROM registros
+                WHERE entrada_data IS NULL
+                ORDER BY entrada COLLATE NOCASE, id
+                LIMIT ?
+                """,
+                (limite if limite else -1,)
+            ).fetchall()
+
+    def contar_datas_invalidas(self):
+        with self.pool.leitura() as conn:
+            return conn.execute("SELECT COUNT(*) FROM registros WHERE entrada_data IS NULL").fetchone()[0]
+
+    def pesquisar(self, texto, limit=None, criterio="ENTRADA", cancelado=None):
+        """Pesquisa por prefixo nos campos de CAMPOS_PESQUISA usando o índice FTS5.
+
+        `cancelado` (opcional) é chamado periodicamente pelo SQLite; se
+        retornar True a consulta é interrompida com OperationalError.
+        """
+        allowed = {"ENTRADA": "entrada", "COTISTA": "cotista"}
+        col = allowed.get(str(criterio).upper(), "entrada")
+        limite = limit if limit else -1
+        with self.pool.leitura() as conn:
+            if cancelado is not None:
+                conn.set_progress_handler(lambda: 1 if cancelado() else 0, 1000)
+            try:
+                return self._pesquisar(conn, texto, limite, col)
+            finally:
+                if cancelado is not None:
+                    conn.set_progress_handler(None, 0)
+
+    def _pesquisar(self, conn, texto, limite, col):
+        if self.fts_disponivel:
+            consulta = montar_consulta_fts(texto)
+            if not consulta:
+                return []
+            cursor = conn.execute(f"""
+                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                       disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+                FROM registros
+                WHERE id IN (SELECT rowid FROM registros_fts WHERE registros_fts MATCH ?)
+                ORDER BY {col} COLLATE NOCASE, id
+                LIMIT ?
+            """, (consulta, limite))
+        else:
+            # Sem FTS5: varredura com LIKE nos mesmos campos
+            filtro = " OR ".join(f"{c} LIKE ?" for c in CAMPOS_PESQUISA)
+            padrao = f"%{(texto or '').strip()}%"
+            cursor = conn.execute(f"""
+                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
+                       disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
+                FROM registros
+                WHERE {filtro}
+                ORDER BY {col} COLLATE NOCASE, id
+                LIMIT ?
+            """, [padrao] * len(CAMPOS_PESQUISA) + [limite])
+        return cursor.fetchall()
+
+    def sincronizar_cotista(self, id_registro, cotista, contato, cotista_antigo, contato_antigo):
+        """Replica COTISTA/CONTATO nos outros registros que tinham os valores antigos."""
+        with self.pool.escrita() as conn:
+            cur = conn.execute(
+                """
+                UPDATE registros
+                SET cotista=?, contato=?
+                WHERE id <> ? AND cotista=? AND contato=?
+                """,
+                (cotista, contato, id_registro, cotista_antigo, contato_antigo)
+            )
+            return cur.rowcount
+
+    def validar_dados(self, dados):
+        """Valida tupla/lista de dados no formato esperado pelo banco."""
+        erros = []
+        # Cotista obrigatório
+        if not dados or not dados[0] or not str(dados[0]).strip():
+            erros.append("Campo Cotista é obrigatório")
+        # Data de entrada (YYYY-MM-DD)
+        try:
+            datetime.datetime.strptime(dados[3], "%Y-%m-%d")
+        except Exception:
+            erros.append("Data de entrada inválida (use o calendário)")
+        # Telefone (opcional)
+        if len(dados) > 1 and dados[1]:
+            if not re.match(r'^\(?\d{2}\)?\s?\d{4,5}-\d{4}$', str(dados[1])):
+                erros.append("Formato de telefone inválido. Ex: (17) 99624-5935")
+        return erros
+    def excluir(self, id_registro):
+        """Exclui um registro por ID com log. Retorna True se excluiu, False se não encontrou."""
+        try:
+            with self.pool.escrita() as conn:
+                cur = conn.cursor()
+                cur.execute("SELECT cotista FROM registros WHERE id=?", (id_registro,))
+                row = cur.fetchone()
+                if not row:
+                    return False
+                cotista = row[0]
+                cur.execute("DELETE FROM registros WHERE id=?", (id_registro,))
+                registrar_log("EXCLUIR", f"ID: {id_registro}, Cotista: {cotista}")
+                return True
+        except Exception as e:
+            # Preferimos não estourar exceção para a UI; retorna False e loga
+            try:
+                registrar_log("ERRO", f"Falha ao excluir ID {id_registro}: {e}")
+            except Exception:
+                pass
+            return False
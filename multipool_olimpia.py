@@ -1,162 +1,41 @@
 import sys
+import time
+
+INICIO_PROCESSO = time.perf_counter()  # Base do relatório de tempos da abertura
+
+if __name__ == "__main__" and sys.argv[1:2] == ["cli"]:
+    # Modo linha de comando (também no .exe): não carrega PyQt5/matplotlib
+    from multipool_cli import main as main_cli
+    sys.exit(main_cli(sys.argv[2:]))
+
 import os
 import socket
 import getpass
 import sqlite3
 import datetime
-import shutil
-from collections import defaultdict
-from PyQt5 import QtWidgets, QtCore, QtGui
-from openpyxl import Workbook, load_workbook
-from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-import time
 import re
+import math
+from collections import defaultdict, deque
+from PyQt5 import QtWidgets, QtCore, QtGui
 
-# ---- Caminho do banco robusto para .py e .exe (PyInstaller) ----
-# CONFIG_UI_FILE will be set after resource_path is defined
-
-def ler_config_str(chave, padrao=""):
-    try:
-        if os.path.exists(CONFIG_UI_FILE):
-            with open(CONFIG_UI_FILE, "r", encoding="utf-8") as f:
-                for linha in f:
-                    if "=" in linha:
-                        k, v = linha.strip().split("=", 1)
-                        if k.strip().upper() == chave.upper():
-                            return v.strip()
-    except Exception:
-        pass
-    return padrao
-
-def app_base_dir():
-    if getattr(sys, "frozen", False):
-        return os.path.dirname(sys.executable)
-    return os.path.dirname(os.path.abspath(__file__))
-
-
-
+from multipool_core import (
+    CAMPOS_AUDITORIA, CONFIG_UI_FILE, DB_FILE, LOG_DIR,
+    ArmazemBackups, DatabaseManager, IndiceLogs,
+    backup_banco, chave_ordenacao, encerrar_log, exportar_para_excel, formatar_data_display,
+    formatar_tamanho, get_conn, importar_planilha, ler_config_kv, podar_backups, registrar_log,
+    resource_path,
+)
 
 
-# --- Connection helper for consistent PRAGMAs and timeouts (added by review) ---
-def get_conn(db_path):
-    conn = sqlite3.connect(db_path, timeout=7.0, isolation_level=None)
-    cur = conn.cursor()
-    try:
-        cur.execute("PRAGMA journal_mode=WAL;")
-    except Exception:
-        pass
-    cur.execute("PRAGMA busy_timeout=7000;")
-    cur.execute("PRAGMA synchronous=NORMAL;")
-    cur.execute("PRAGMA foreign_keys=ON;")
-    return conn
-
-def operacao_com_retry(func, max_tentativas=3):
-    """Executa uma função com retentativas progressivas em caso de 'database is locked'."""
-    for tentativa in range(max_tentativas):
-        try:
-            return func()
-        except sqlite3.OperationalError as e:
-            if "locked" in str(e).lower() and tentativa < max_tentativas - 1:
-                time.sleep(0.5 * (tentativa + 1))  # backoff simples
-                continue
-            raise
-
-def resource_path(relative_path):
-    """Retorna caminho absoluto para arquivo, mesmo no executável."""
-    if hasattr(sys, '_MEIPASS'):  # Quando rodando pelo PyInstaller
-        base_path = sys._MEIPASS
-    else:
-        base_path = app_base_dir()
-    return os.path.join(base_path, relative_path)
-
 # Suprimir avisos do Qt sobre fontes
 os.environ['QT_LOGGING_RULES'] = 'qt.qpa.plugin=false'
 os.environ['QT_FONT_DPI'] = '96'
 
-LOG_DIR = "logs"
-BACKUP_DIR = "backups"
-CONFIG_DB_FILE = resource_path("db_config.txt")
-CONFIG_UI_FILE = resource_path("ui_config.txt")
-
-def ler_config_kv(path, chave, padrao=""):
-    try:
-        if os.path.exists(path):
-            with open(path, "r", encoding="utf-8") as f:
-                for linha in f:
-                    if "=" in linha:
-                        k, v = linha.strip().split("=", 1)
-                        if k.strip().upper() == chave.upper():
-                            return v.strip()
-    except Exception:
-        pass
-    return padrao
-
-DB_FILE = (ler_config_kv(CONFIG_DB_FILE, "DB_PATH") or os.path.join(app_base_dir(), "dados", "multipool.db"))
 LOCK_TTL_MIN = int(ler_config_kv(CONFIG_UI_FILE, "LOCK_TTL_MIN", "45") or 45)
-os.makedirs(os.path.join(app_base_dir(), "dados"), exist_ok=True)
-ONEDRIVE_FILE = "onedrive_path.txt"
 LOGO_PATH = resource_path("logo.png")
 
-def garantir_diretorio(path):
-    os.makedirs(path, exist_ok=True)
+_RE_DATA_ISO = re.compile(r"\d{4}-\d{2}-\d{2}")
 
-def formatar_data_display(data_str):
-    if not data_str:
-        return "–"
-    for fmt in ["%Y-%m-%d", "%d/%m/%Y"]:
-        try:
-            return datetime.datetime.strptime(data_str[:10], fmt).strftime("%d/%m/%Y")
-        except ValueError:
-            pass
-    return data_str
-
-def normalizar_data(celula):
-    if isinstance(celula, (datetime.datetime, datetime.date)):
-        return celula.strftime("%Y-%m-%d")
-    if not celula:
-        return ""
-    texto = str(celula)
-    for fmt in ["%d/%m/%Y", "%Y-%m-%d"]:
-        try:
-            return datetime.datetime.strptime(texto[:10], fmt).strftime("%Y-%m-%d")
-        except:
-            pass
-    return texto
-
-def backup_banco():
-    garantir_diretorio(BACKUP_DIR)
-    if os.path.exists(DB_FILE):
-        destino = os.path.join(BACKUP_DIR, f"backup_{datetime.datetime.now():%Y-%m-%d_%H%M%S}.db")
-        shutil.copy2(DB_FILE, destino)
-
-def registrar_log(acao, dados):
-    garantir_diretorio(LOG_DIR)
-    log_path = os.path.join(LOG_DIR, f"log_{datetime.date.today()}.txt")
-    with open(log_path, "a", encoding="utf-8") as f:
-        f.write(f"[{datetime.datetime.now()}] {acao}: {dados}\n")
-
-def exportar_para_excel(dados, nome_arquivo):
-    garantir_diretorio("exportacoes")
-    caminho = os.path.join("exportacoes", f"{nome_arquivo}.xlsx")
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Datas"
-    # Cabeçalhos incluindo campos internos
-    ws.append([
-        "Cotista", "Contato", "Empreendimento", "Entrada", "Saída", "Dormitório", 
-        "Valor", "Disponível", "Fonte", "Nº da Cota", "Nº Apartamento", "Torre", 
-        "Letra de Prioridade (HBS-Royal)"
-    ])
-    for linha in dados:
-        # Incluir todos os campos, exceto ID e timestamp
-        linha_export = linha[1:]  # Remove ID
-        if len(linha_export) > 13:  # Remove timestamp se existir
-            linha_export = linha_export[:13]
-        ws.append(linha_export)
-    wb.save(caminho)
-    return caminho
 def salvar_config(aba, criterio):
     with open(CONFIG_UI_FILE, "w", encoding="utf-8") as f:
         f.write(f"{aba}\n{criterio}")
@@ -174,216 +53,948 @@ def carregar_config():
     except Exception:
         return 0, "ENTRADA"
 
-class DatabaseManager:
-    def __init__(self, db_file):
-        self.db_file = db_file
-        self.init_db()
-
-    def init_db(self):
-        # Abre a conexão com o banco
-        with get_conn(self.db_file) as conn:
-            # 1. Ativar WAL para mais segurança em múltiplos acessos
-            conn.execute("PRAGMA journal_mode=WAL;")
-
-            # 2. Criar a tabela se não existir
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS registros (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    cotista TEXT NOT NULL,
-                    contato TEXT,
-                    empreendimento TEXT,
-                    entrada TEXT NOT NULL,
-                    saida TEXT,
-                    dormitorio TEXT,
-                    valor TEXT,
-                    disponivel TEXT DEFAULT 'Sim',
-                    fonte TEXT DEFAULT 'Cliente',
-                    numero_cota TEXT,
-                    numero_apartamento TEXT,
-                    torre TEXT,
-                    letra_prioridade TEXT,
-                    criado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # Indexes added by review for performance (separate executes)
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_entrada ON registros(entrada);")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_cotista ON registros(cotista COLLATE NOCASE);")
-            conn.execute("CREATE INDEX IF NOT EXISTS idx_registros_emp ON registros(empreendimento COLLATE NOCASE);")
-            # Índice único para evitar duplicatas (cotista, entrada, empreendimento)
-            try:
-                conn.execute("""
-                    CREATE UNIQUE INDEX IF NOT EXISTS ux_registros_cotista_entrada_emp
-                    ON registros(cotista, entrada, COALESCE(empreendimento, ''))
-                """)
-            except Exception:
-                pass
-            # 3. Garantir que as colunas novas existam (compatibilidade com bancos antigos)
-            cursor = conn.cursor()
-            cursor.execute("PRAGMA table_info(registros)")
-            colunas = [coluna[1] for coluna in cursor.fetchall()]
+class MplCanvas(QtWidgets.QWidget):
+    """Área dos gráficos da Contabilidade.
 
-            # Colunas principais
-            if 'disponivel' not in colunas:
-                conn.execute("ALTER TABLE registros ADD COLUMN disponivel TEXT DEFAULT 'Sim'")
-            if 'fonte' not in colunas:
-                conn.execute("ALTER TABLE registros ADD COLUMN fonte TEXT DEFAULT 'Cliente'")
+    O matplotlib só é importado (e a figura criada) em `preparar`, na
+    primeira vez que os gráficos são desenhados; até lá fica um aviso.
+    """
 
-            # Campos internos adicionais
-            if 'numero_cota' not in colunas:
-                conn.execute("ALTER TABLE registros ADD COLUMN numero_cota TEXT")
-            if 'numero_apartamento' not in colunas:
-                conn.execute("ALTER TABLE registros ADD COLUMN numero_apartamento TEXT")
-            if 'torre' not in colunas:
-                conn.execute("ALTER TABLE registros ADD COLUMN torre TEXT")
-            if 'letra_prioridade' not in colunas:
-                conn.execute("ALTER TABLE registros ADD COLUMN letra_prioridade TEXT")
-
-            conn.commit()
-
-    def inserir(self, dados):
-        # Garantir que temos 13 elementos (incluindo todos os campos)
-        while len(dados) < 13:
-            if len(dados) == 7:
-                dados.append("Sim")  # disponivel
-            elif len(dados) == 8:
-                dados.append("Cliente")  # fonte
-            elif len(dados) == 9:
-                dados.append("")  # numero_cota
-            elif len(dados) == 10:
-                dados.append("")  # numero_apartamento
-            elif len(dados) == 11:
-                dados.append("")  # torre
-            elif len(dados) == 12:
-                dados.append("")  # letra_prioridade
-
-        with get_conn(self.db_file) as conn:
-            conn.execute("""
-                INSERT INTO registros (cotista, contato, empreendimento, entrada, saida, dormitorio, valor, disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, dados)
-            registrar_log("INSERIR", f"Cotista: {dados[0]}, Entrada: {dados[3]}")
-
-    def buscar_ordenado(self, criterio="ENTRADA"):
-        allowed = {"ENTRADA": "entrada", "COTISTA": "cotista"}
-        col = allowed.get(str(criterio).upper(), "entrada")
-        with get_conn(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
-                        disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
-                FROM registros
-                ORDER BY """ + col + " COLLATE NOCASE"
-            )
-            return cursor.fetchall()
-    def atualizar(self, id_registro, dados):
-        # Garantir que temos 13 elementos
-        while len(dados) < 13:
-            if len(dados) == 7:
-                dados.append("Sim")
-            elif len(dados) == 8:
-                dados.append("Cliente")
-            elif len(dados) == 9:
-                dados.append("")
-            elif len(dados) == 10:
-                dados.append("")
-            elif len(dados) == 11:
-                dados.append("")
-            elif len(dados) == 12:
-                dados.append("")
-
-        with get_conn(self.db_file) as conn:
-            conn.execute("""
-                UPDATE registros 
-                SET cotista=?, contato=?, empreendimento=?, entrada=?, saida=?, dormitorio=?, valor=?, disponivel=?, fonte=?, numero_cota=?, numero_apartamento=?, torre=?, letra_prioridade=?
-                WHERE id=?
-            """, dados + [id_registro])
-            registrar_log("ATUALIZAR", f"ID: {id_registro}, Cotista: {dados[0]}")
+    def __init__(self, width=12, height=8, dpi=100):
+        super().__init__()
+        self._tamanho = (width, height, dpi)
+        self.fig = None
+        self._canvas = None
+        self._layout = QtWidgets.QVBoxLayout(self)
+        self._layout.setContentsMargins(0, 0, 0, 0)
+        self._aviso = QtWidgets.QLabel("Clique em \"📈 Atualizar Gráficos\" para gerar os gráficos.")
+        self._aviso.setAlignment(QtCore.Qt.AlignCenter)
+        self._aviso.setStyleSheet("color: #aaaaaa; font-size: 14px;")
+        self._layout.addWidget(self._aviso)
+
+    def preparar(self):
+        """Cria a figura na primeira chamada e a retorna."""
+        if self.fig is None:
+            from matplotlib.backends.backend_qtagg import FigureCanvasQTAgg
+            from matplotlib.figure import Figure
+
+            width, height, dpi = self._tamanho
+            self.fig = Figure(figsize=(width, height), dpi=dpi, facecolor='#2d2d2d')
+            self._canvas = FigureCanvasQTAgg(self.fig)
+            self._layout.removeWidget(self._aviso)
+            self._aviso.deleteLater()
+            self._layout.addWidget(self._canvas)
+        return self.fig
+
+    def draw(self):
+        self._canvas.draw()
+
+    def draw_idle(self):
+        self._canvas.draw_idle()
+
+class GraficosContabilidade(MplCanvas):
+    """Os quatro gráficos da Contabilidade com artistas persistentes.
+
+    Eixos, barras, fatias, textos e a linha são criados uma única vez (com
+    estilo e layout) em `preparar`; `atualizar` só troca os dados nesses
+    artistas e pede um draw_idle, então mudar os filtros não refaz a figura.
+    O tight_layout roda só no primeiro desenho e quando a área muda de tamanho.
+    """
+
+    MAX_MESES = 12
+    FUNDO = '#2d2d2d'
+    DISPONIBILIDADE = ("Sim", "Não")
+    FONTES = ("Cliente", "Lead Internet", "Terceiros")
+
+    def preparar(self):
+        if self.fig is not None:
+            return self.fig
+        import matplotlib
+
+        matplotlib.rcParams.update({
+            "text.color": "white",
+            "axes.labelcolor": "white",
+            "axes.edgecolor": "white",
+            "xtick.color": "white",
+            "ytick.color": "white",
+            "axes.titleweight": "bold",
+            "axes.titlecolor": "white",
+            "font.size": 11
+        })
+        fig = super().preparar()
+        posicoes = range(self.MAX_MESES)
+
+        # ---------- Gráfico 1: Registros por mês ----------
+        self.ax_meses = fig.add_subplot(2, 2, 1, facecolor=self.FUNDO)
+        self.barras = self.ax_meses.bar(posicoes, [0] * self.MAX_MESES, color='#4CAF50',
+                                        alpha=0.85, edgecolor='white')
+        self.rotulos_barras = [
+            self.ax_meses.text(x, 0, "", ha='center', va='bottom', color='white', fontsize=9)
+            for x in posicoes
+        ]
+        self.ax_meses.set_title('Registros por Mês', fontsize=13, color='white', pad=12)
+        self.ax_meses.set_ylabel('Quantidade', color='white')
+
+        # ---------- Gráficos 2 e 3: Disponibilidade e Fontes ----------
+        self.ax_disponibilidade = fig.add_subplot(2, 2, 2, facecolor=self.FUNDO)
+        self.fatias_disponibilidade = self._criar_pizza(
+            self.ax_disponibilidade, 'Disponibilidade', self.DISPONIBILIDADE, ['#4CAF50', '#f44336'])
+        self.ax_fontes = fig.add_subplot(2, 2, 3, facecolor=self.FUNDO)
+        self.fatias_fontes = self._criar_pizza(
+            self.ax_fontes, 'Fontes', self.FONTES, ['#FF9800', '#2196F3', '#9C27B0'])
+
+        # ---------- Gráfico 4: Valores por mês ----------
+        self.ax_valores = fig.add_subplot(2, 2, 4, facecolor=self.FUNDO)
+        self.linha_valores, = self.ax_valores.plot([], [], marker='o', color='#00BCD4',
+                                                   linewidth=2, markersize=6)
+        self.ax_valores.set_title('Valores por Mês (R$)', fontsize=13, color='white', pad=12)
+        self.ax_valores.set_ylabel('Valor (R$)', color='white')
+        self.ax_valores.grid(True, alpha=0.2, color='white')
+
+        for ax in (self.ax_meses, self.ax_valores):
+            ax.set_xlim(-0.6, self.MAX_MESES - 0.4)
+            ax.set_xticks(posicoes)
+            ax.tick_params(axis='x', rotation=30)
+            for spine in ["top", "right"]:
+                ax.spines[spine].set_visible(False)
+        self._layout_pendente = True
+        self._ultimos_dados = None
+        self._canvas.mpl_connect('resize_event', lambda evento: self._ajustar_layout())
+        return fig
+
+    def _ajustar_layout(self):
+        self._layout_pendente = False
+        self.fig.tight_layout(pad=2.0)
+
+    def _criar_pizza(self, ax, titulo, rotulos, cores):
+        fatias, _, textos = ax.pie([1] * len(rotulos), autopct='%1.1f%%', startangle=90,
+                                   colors=cores, wedgeprops={'edgecolor': 'white'})
+        ax.set_title(titulo, fontsize=13, color='white', pad=12)
+        ax.legend(fatias, rotulos, loc="center left", bbox_to_anchor=(1, 0.5))
+        for texto in textos:
+            texto.set_color("white")
+            texto.set_fontweight("bold")
+        return list(zip(fatias, textos))
+
+    @staticmethod
+    def _atualizar_pizza(fatias, valores, inicio=90):
+        """Mesma geometria de ax.pie(startangle=90, autopct='%1.1f%%'), nos artistas existentes."""
+        total = sum(valores)
+        angulo = inicio
+        for (fatia, texto), valor in zip(fatias, valores):
+            fracao = valor / total if total else 0
+            fatia.set_theta1(angulo)
+            fatia.set_theta2(angulo + 360 * fracao)
+            meio = math.radians(angulo + 180 * fracao)
+            texto.set_position((0.6 * math.cos(meio), 0.6 * math.sin(meio)))
+            texto.set_text(f"{fracao * 100:.1f}%")
+            fatia.set_visible(fracao > 0)
+            texto.set_visible(fracao > 0)
+            angulo += 360 * fracao
+
+    def atualizar(self, meses, quantidades, valores, disponibilidade, fontes):
+        """Troca os dados (até MAX_MESES meses) e agenda o redesenho."""
+        self.preparar()
+        meses = list(meses)[-self.MAX_MESES:]
+        quantidades = list(quantidades)[-self.MAX_MESES:]
+        valores = list(valores)[-self.MAX_MESES:]
+        dados = (meses, quantidades, valores, dict(disponibilidade), dict(fontes))
+        if dados == self._ultimos_dados:
+            return  # Filtro mudou sem mudar o resultado: nada a redesenhar
+        self._ultimos_dados = dados
+        rotulos = meses + [""] * (self.MAX_MESES - len(meses))
+
+        maximo = max(quantidades, default=0) or 1
+        for i, (barra, rotulo) in enumerate(zip(self.barras, self.rotulos_barras)):
+            quantidade = quantidades[i] if i < len(quantidades) else 0
+            barra.set_height(quantidade)
+            barra.set_visible(i < len(quantidades))
+            rotulo.set_position((i, quantidade + maximo * 0.01))
+            rotulo.set_text(str(quantidade) if i < len(quantidades) else "")
+        self.ax_meses.set_ylim(0, maximo * 1.12)
+        self.ax_meses.set_xticklabels(rotulos)
+
+        self.linha_valores.set_data(range(len(valores)), valores)
+        minimo, maximo = min(valores, default=0), max(valores, default=0)
+        folga = (maximo - minimo) * 0.08 or max(abs(maximo) * 0.1, 1)
+        self.ax_valores.set_ylim(minimo - folga, maximo + folga)
+        self.ax_valores.set_xticklabels(rotulos)
+
+        self._atualizar_pizza(self.fatias_disponibilidade, [disponibilidade.get(r, 0) for r in self.DISPONIBILIDADE])
+        self._atualizar_pizza(self.fatias_fontes, [fontes.get(r, 0) for r in self.FONTES])
+        if self._layout_pendente:
+            self._ajustar_layout()  # Já com o tamanho da área e os rótulos reais
+        self.draw_idle()
+
+class RelatorioInicio:
+    """Tempo de cada fase da abertura, do início do processo até a fila ociosa esvaziar."""
+
+    def __init__(self, inicio=INICIO_PROCESSO):
+        self._inicio = self._ultimo = inicio
+        self.fases = []  # (fase, ms)
+
+    def marcar(self, fase):
+        """Fecha a fase corrente (tempo de relógio desde a marca anterior)."""
+        agora = time.perf_counter()
+        self.fases.append((fase, (agora - self._ultimo) * 1000))
+        self._ultimo = agora
+
+    @property
+    def total_ms(self):
+        return (time.perf_counter() - self._inicio) * 1000
+
+    def texto(self):
+        partes = [f"{fase}={ms:.0f}ms" for fase, ms in self.fases]
+        return ", ".join(partes + [f"total={self.total_ms:.0f}ms"])
+
+class FilaOciosa(QtCore.QObject):
+    """Trabalho adiado: uma tarefa por volta do loop de eventos.
+
+    O timer de intervalo zero só dispara depois que os eventos pendentes
+    (pintura, teclado, mouse) foram processados, então a janela já aparece
+    e continua respondendo enquanto a fila anda. Erros de uma tarefa vão
+    para o log e não impedem as demais.
+    """
+
+    executada = QtCore.pyqtSignal(str)
+    concluida = QtCore.pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._tarefas = deque()
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._executar_proxima)
+
+    def agendar(self, nome, tarefa):
+        self._tarefas.append((nome, tarefa))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def parar(self):
+        """Descarta as tarefas ainda não executadas."""
+        self._timer.stop()
+        self._tarefas.clear()
+
+    def _executar_proxima(self):
+        if not self._tarefas:
+            self._timer.stop()
+            self.concluida.emit()
+            return
+        nome, tarefa = self._tarefas.popleft()
+        try:
+            tarefa()
+        except Exception as e:
+            registrar_log("ERRO", f"Tarefa adiada '{nome}' falhou: {e}")
+        self.executada.emit(nome)
+
+class CacheConsultas:
+    """Cache em memória das leituras da interface, na frente do DatabaseManager.
+
+    Guarda os resultados já calculados (páginas, estatísticas, série mensal,
+    próximos, contagens) e os registros já lidos, por id. A validade é
+    conferida a cada leitura com PRAGMA data_version numa conexão própria:
+    o número muda quando qualquer outra conexão (as de escrita deste
+    processo ou outro computador na rede) confirma uma gravação, e só
+    então o cache é descartado. Uso apenas na thread da interface.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self._conn = get_conn(db.db_file)
+        self._versao = None
+        self._resultados = {}
+        self.registros = {}  # id -> registro
+
+    def fechar(self):
+        self._conn.close()
+
+    def _validar(self):
+        versao = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if versao != self._versao:
+            self._versao = versao
+            self._resultados.clear()
+            self.registros.clear()
+
+    def _memo(self, chave, carregar):
+        self._validar()
+        try:
+            return self._resultados[chave]
+        except KeyError:
+            valor = self._resultados[chave] = carregar()
+            return valor
+
+    def buscar_pagina(self, criterio="ENTRADA", apos=None, limite=200, periodo=None, hoje=None,
+                      decrescente=False):
+        hoje = str(hoje or datetime.date.today().isoformat())
+        chave = ("pagina", criterio, apos, limite, periodo, hoje, decrescente)
+
+        def carregar():
+            registros, token = self.db.buscar_pagina(criterio, apos, limite, periodo, hoje, decrescente)
+            for registro in registros:
+                self.registros[registro[0]] = registro
+            return registros, token
+        return self._memo(chave, carregar)
 
     def buscar_por_id(self, id_registro):
-        with get_conn(self.db_file) as conn:
-            cursor = conn.cursor()
-            # Buscar apenas os campos necessários, excluindo o timestamp
-            cursor.execute("""
-                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor, 
-                        disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
-                FROM registros WHERE id=?
-            """, (id_registro,))
-            return cursor.fetchone()
-
-    def existe_duplicata(self, cotista, entrada, empreendimento):
-        with get_conn(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute(
-                """
-                SELECT COUNT(*) FROM registros 
-                WHERE cotista=? AND entrada=? AND COALESCE(empreendimento, '')=?
-                """,
-                (cotista, entrada, empreendimento or '')
-            )
-            return cursor.fetchone()[0] > 0
-
-        
-    # Adicionar paginação para grandes datasets
-    def buscar_paginado(self, criterio="ENTRADA", pagina=1, por_pagina=100):
-        """Retorna registros paginados ordenados por entrada ou cotista."""
-        offset = (pagina - 1) * por_pagina
-        allowed = {"ENTRADA": "entrada", "COTISTA": "cotista"}
-        col = allowed.get(str(criterio).upper(), "entrada")
-        with get_conn(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute(f"""
-                SELECT id, cotista, contato, empreendimento, entrada, saida, dormitorio, valor,
-                       disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade
-                FROM registros
-                ORDER BY {col} COLLATE NOCASE
-                LIMIT ? OFFSET ?
-            """, (por_pagina, offset))
-            return cursor.fetchall()
-
-    def validar_dados(self, dados):
-        """Valida tupla/lista de dados no formato esperado pelo banco."""
-        erros = []
-        # Cotista obrigatório
-        if not dados or not dados[0] or not str(dados[0]).strip():
-            erros.append("Campo Cotista é obrigatório")
-        # Data de entrada (YYYY-MM-DD)
+        self._validar()
+        registro = self.registros.get(id_registro)
+        if registro is None:
+            registro = self.db.buscar_por_id(id_registro)
+            if registro is not None:
+                self.registros[id_registro] = registro
+        return registro
+
+    def estatisticas(self, hoje=None):
+        hoje = hoje or datetime.date.today()
+        return self._memo(("estatisticas", hoje), lambda: self.db.estatisticas(hoje))
+
+    def serie_mensal(self, inicio, fim, empreendimento=None):
+        chave = ("serie", str(inicio), str(fim), (empreendimento or "").strip().lower())
+        return self._memo(chave, lambda: self.db.serie_mensal(inicio, fim, empreendimento))
+
+    def proximos(self, dias=7, hoje=None, somente_disponiveis=False):
+        hoje = hoje or datetime.date.today()
+        chave = ("proximos", dias, hoje, somente_disponiveis)
+        return self._memo(chave, lambda: self.db.proximos(dias, hoje, somente_disponiveis))
+
+    def contar(self):
+        return self._memo(("contar",), self.db.contar)
+
+    def contar_datas_invalidas(self):
+        return self._memo(("invalidas",), self.db.contar_datas_invalidas)
+
+class RegistrosTableModel(QtCore.QAbstractTableModel):
+    """Modelo virtual das tabelas de registros.
+
+    Guarda as tuplas vindas do banco como estão e só formata as células
+    que a view pede em data(), em vez de criar um QTableWidgetItem por célula.
+    Com set_paginado as linhas chegam por páginas keyset conforme a view
+    rola (canFetchMore/fetchMore).
+    """
+
+    CABECALHOS = [
+        "ID", "Cotista", "Contato", "Empreendimento",
+        "Entrada", "Saída", "Dormitório", "Valor", "Disponível", "Fonte"
+    ]
+    COLUNA_DISPONIVEL = 8
+
+    # Cores da coluna Disponível (criadas uma única vez)
+    FUNDO_DISPONIVEL = QtGui.QColor(200, 255, 200)
+    FUNDO_INDISPONIVEL = QtGui.QColor(255, 200, 200)
+    TEXTO_DISPONIBILIDADE = QtGui.QColor(0, 0, 0)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._registros = []
+        self.criterio = "ENTRADA"
+        self.decrescente = False
+        self._carregador = None
+        self._token = None
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._registros)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.CABECALHOS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.CABECALHOS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        registro = self._registros[index.row()]
+        col = index.column()
+
+        if role == QtCore.Qt.DisplayRole:
+            valor = registro[col]
+            if col in (4, 5):  # Datas
+                return formatar_data_display(valor)
+            return str(valor) if valor else ""
+        if role == QtCore.Qt.UserRole:
+            return registro[0]  # ID
+
+        # Colorir por disponibilidade
+        if col == self.COLUNA_DISPONIVEL:
+            if role == QtCore.Qt.BackgroundRole:
+                if str(registro[col]).strip().lower() == "não":
+                    return self.FUNDO_INDISPONIVEL
+                return self.FUNDO_DISPONIVEL
+            if role == QtCore.Qt.ForegroundRole:
+                return self.TEXTO_DISPONIBILIDADE
+        return None
+
+    def set_registros(self, registros, criterio=None, decrescente=False):
+        """Substitui todas as linhas do modelo de uma vez."""
+        self.beginResetModel()
+        self._registros = list(registros)
+        self._carregador = None
+        self._token = None
+        if criterio:
+            self.criterio = criterio
+        self.decrescente = decrescente
+        self.endResetModel()
+
+    def set_paginado(self, carregador, criterio=None, decrescente=False):
+        """Carrega só a primeira página; as próximas vêm quando a view pedir.
+
+        `carregador(token)` devolve (registros, token), como
+        DatabaseManager.buscar_pagina; token None indica que acabou.
+        """
+        registros, token = carregador(None)
+        self.beginResetModel()
+        self._registros = list(registros)
+        self._carregador = carregador
+        self._token = token
+        if criterio:
+            self.criterio = criterio
+        self.decrescente = decrescente
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self._token is not None
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self._token is None:
+            return
         try:
-            datetime.datetime.strptime(dados[3], "%Y-%m-%d")
-        except Exception:
-            erros.append("Data de entrada inválida (use o calendário)")
-        # Telefone (opcional)
-        if len(dados) > 1 and dados[1]:
-            if not re.match(r'^\(?\d{2}\)?\s?\d{4,5}-\d{4}$', str(dados[1])):
-                erros.append("Formato de telefone inválido. Ex: (17) 99624-5935")
-        return erros
-    def excluir(self, id_registro):
-        """Exclui um registro por ID com log. Retorna True se excluiu, False se não encontrou."""
+            registros, token = self._carregador(self._token)
+        except sqlite3.Error:
+            return  # Banco ocupado: a view pede de novo no próximo scroll
+        self._token = token
+        if registros:
+            inicio = len(self._registros)
+            self.beginInsertRows(QtCore.QModelIndex(), inicio, inicio + len(registros) - 1)
+            self._registros.extend(registros)
+            self.endInsertRows()
+
+    def registro(self, row):
+        return self._registros[row]
+
+    def remover_linha(self, row):
+        self.beginRemoveRows(QtCore.QModelIndex(), row, row)
+        del self._registros[row]
+        self.endRemoveRows()
+
+    def _posicao(self, chave):
+        """Busca binária: primeira linha que não vem antes de `chave` na ordem do modelo."""
+        lo, hi = 0, len(self._registros)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            atual = chave_ordenacao(self._registros[mid], self.criterio)
+            if (atual > chave) if self.decrescente else (atual < chave):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def localizar(self, registro):
+        """Retorna a linha do registro (pelo ID) ou -1 se não estiver no modelo."""
+        row = self._posicao(chave_ordenacao(registro, self.criterio))
+        if row < len(self._registros) and self._registros[row][0] == registro[0]:
+            return row
+        # Registro pode ter mudado desde a carga; cai para a busca linear
+        for row, atual in enumerate(self._registros):
+            if atual[0] == registro[0]:
+                return row
+        return -1
+
+    def inserir_ordenado(self, registro):
+        """Insere o registro na posição ordenada e retorna a linha usada.
+
+        Se ele cair depois da última página carregada retorna -1: a
+        próxima página já o trará.
+        """
+        row = self._posicao(chave_ordenacao(registro, self.criterio))
+        if self._token is not None and row == len(self._registros):
+            return -1
+        self.beginInsertRows(QtCore.QModelIndex(), row, row)
+        self._registros.insert(row, registro)
+        self.endInsertRows()
+        return row
+
+    def registro_por_id(self, id_registro):
+        """Registro carregado com esse ID, ou None (busca linear)."""
+        for registro in self._registros:
+            if registro[0] == id_registro:
+                return registro
+        return None
+
+    def remover_registro(self, registro):
+        """Remove o registro (pelo ID). Retorna True se ele estava no modelo."""
+        row = self.localizar(registro)
+        if row < 0:
+            return False
+        self.remover_linha(row)
+        return True
+
+class LogsTableModel(QtCore.QAbstractTableModel):
+    """Entradas do IndiceLogs, paginadas do mais novo para o mais antigo."""
+
+    CABECALHOS = ["Data/Hora", "Ação", "ID", "Cotista", "Detalhes", "Usuário"]
+    CORES_ACAO = {
+        "INSERIR": QtGui.QColor(102, 187, 106),
+        "ATUALIZAR": QtGui.QColor(66, 165, 245),
+        "EXCLUIR": QtGui.QColor(255, 167, 38),
+        "ERRO": QtGui.QColor(239, 83, 80),
+    }
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._entradas = []
+        self._carregador = None
+        self._token = None
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self._entradas)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 0 if parent.isValid() else len(self.CABECALHOS)
+
+    def headerData(self, section, orientation, role=QtCore.Qt.DisplayRole):
+        if role == QtCore.Qt.DisplayRole and orientation == QtCore.Qt.Horizontal:
+            return self.CABECALHOS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        entrada = self._entradas[index.row()]
+        col = index.column()
+        if role == QtCore.Qt.DisplayRole:
+            if col == 0:
+                return entrada.momento[:19]
+            if col == 5:
+                return f"{entrada.usuario}@{entrada.host}" if entrada.usuario else ""
+            valor = (None, entrada.acao, entrada.id_registro, entrada.cotista, entrada.dados)[col]
+            return "" if valor is None else str(valor)
+        if role == QtCore.Qt.ForegroundRole and col == 1:
+            return self.CORES_ACAO.get(entrada.acao)
+        return None
+
+    def set_paginado(self, carregador):
+        """Primeira página agora; as próximas por fetchMore (carregador(token) -> (entradas, token))."""
+        entradas, token = carregador(None)
+        self.beginResetModel()
+        self._entradas = list(entradas)
+        self._carregador = carregador
+        self._token = token
+        self.endResetModel()
+
+    def canFetchMore(self, parent=QtCore.QModelIndex()):
+        return not parent.isValid() and self._token is not None
+
+    def fetchMore(self, parent=QtCore.QModelIndex()):
+        if parent.isValid() or self._token is None:
+            return
+        entradas, self._token = self._carregador(self._token)
+        if entradas:
+            inicio = len(self._entradas)
+            self.beginInsertRows(QtCore.QModelIndex(), inicio, inicio + len(entradas) - 1)
+            self._entradas.extend(entradas)
+            self.endInsertRows()
+
+class _SinaisPesquisa(QtCore.QObject):
+    concluida = QtCore.pyqtSignal(int, str, list)
+    falhou = QtCore.pyqtSignal(int, str, str)
+
+class _TarefaPesquisa(QtCore.QRunnable):
+    """Executa DatabaseManager.pesquisar fora da thread da interface."""
+
+    def __init__(self, db, geracao, texto, criterio, sinais, cancelado):
+        super().__init__()
+        self.db = db
+        self.geracao = geracao
+        self.texto = texto
+        self.criterio = criterio
+        self.sinais = sinais
+        self.cancelado = cancelado
+
+    def run(self):
+        if self.cancelado():
+            return
         try:
-            with get_conn(self.db_file) as conn:
-                cur = conn.cursor()
-                cur.execute("SELECT cotista FROM registros WHERE id=?", (id_registro,))
-                row = cur.fetchone()
-                if not row:
-                    return False
-                cotista = row[0]
-                cur.execute("DELETE FROM registros WHERE id=?", (id_registro,))
-                registrar_log("EXCLUIR", f"ID: {id_registro}, Cotista: {cotista}")
-                return True
+            registros = self.db.pesquisar(self.texto, criterio=self.criterio, cancelado=self.cancelado)
         except Exception as e:
-            # Preferimos não estourar exceção para a UI; retorna False e loga
+            # Consulta interrompida por um termo mais novo: só descartar
+            if not self.cancelado():
+                self.sinais.falhou.emit(self.geracao, self.texto, str(e))
+            return
+        if not self.cancelado():
+            self.sinais.concluida.emit(self.geracao, self.texto, registros)
+
+class CoordenadorPesquisa(QtCore.QObject):
+    """Debounce das teclas + pesquisa em segundo plano.
+
+    Cada pedido recebe um número de geração; ao chegar um termo novo a
+    consulta anterior é interrompida (progress handler do SQLite) e
+    qualquer resultado atrasado é descartado. Só o resultado da última
+    geração chega em `resultado`.
+    """
+
+    INTERVALO_MS = 250
+
+    resultado = QtCore.pyqtSignal(str, list)
+    erro = QtCore.pyqtSignal(str, str)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._geracao = 0
+        self._texto = ""
+        self._criterio = "ENTRADA"
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(self.INTERVALO_MS)
+        self._timer.timeout.connect(self.executar_agora)
+
+        # Threads próprias: uma consulta presa no busy_timeout não trava as outras
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(2)
+
+        self._sinais = _SinaisPesquisa(self)
+        self._sinais.concluida.connect(self._concluida)
+        self._sinais.falhou.connect(self._falhou)
+
+    def solicitar(self, texto, criterio="ENTRADA"):
+        """Agenda a pesquisa; teclas seguidas reiniciam a espera."""
+        self._texto = texto
+        self._criterio = criterio
+        self._timer.start()
+
+    def executar_agora(self, texto=None, criterio=None):
+        """Dispara a pesquisa imediatamente (Enter ou reaplicar filtro)."""
+        self._timer.stop()
+        if texto is not None:
+            self._texto = texto
+        if criterio is not None:
+            self._criterio = criterio
+        self._geracao += 1
+        geracao = self._geracao
+        tarefa = _TarefaPesquisa(
+            self.db, geracao, self._texto, self._criterio, self._sinais,
+            lambda: self._geracao != geracao
+        )
+        self._pool.start(tarefa)
+
+    def cancelar(self):
+        """Descarta o pedido pendente e a consulta em andamento."""
+        self._timer.stop()
+        self._geracao += 1
+
+    def encerrar(self):
+        """Cancela e espera as consultas em andamento (antes de fechar o banco)."""
+        self.cancelar()
+        self._pool.waitForDone()
+
+    def _concluida(self, geracao, texto, registros):
+        if geracao == self._geracao:
+            self.resultado.emit(texto, registros)
+
+    def _falhou(self, geracao, texto, mensagem):
+        if geracao == self._geracao:
+            self.erro.emit(texto, mensagem)
+
+class _SinaisAlteracoes(QtCore.QObject):
+    recebidas = QtCore.pyqtSignal(object, object)
+
+class _TarefaAlteracoes(QtCore.QRunnable):
+    def __init__(self, observador):
+        super().__init__()
+        self.observador = observador
+
+    def run(self):
+        self.observador._verificar()
+
+class ObservadorAlteracoes(QtCore.QObject):
+    """Acompanha as gravações de outro PC sem recarregar a tabela.
+
+    A cada INTERVALO_MS uma tarefa em segundo plano lê PRAGMA data_version
+    numa conexão própria (não toca nas páginas de dados); só quando ele
+    muda pede ao banco as linhas da tabela alteracoes depois da última
+    sequência aplicada. `alteracoes(alterados, excluidos)` chega na thread
+    da interface; alterados None indica mudanças demais para aplicar uma a uma.
+    """
+
+    INTERVALO_MS = 2000
+
+    alteracoes = QtCore.pyqtSignal(object, object)
+
+    def __init__(self, db, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._conn = get_conn(db.db_file, check_same_thread=False)
+        self._versao = None
+        self._seq = db.ultima_alteracao()
+        self._ocupado = False
+
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(self.INTERVALO_MS)
+        self._timer.timeout.connect(self._agendar)
+
+        self._pool = QtCore.QThreadPool(self)
+        self._pool.setMaxThreadCount(1)
+
+        self._sinais = _SinaisAlteracoes(self)
+        self._sinais.recebidas.connect(self.alteracoes)
+
+    def iniciar(self):
+        self._timer.start()
+
+    def parar(self):
+        self._timer.stop()
+        self._pool.waitForDone()
+        self._conn.close()
+
+    def _agendar(self):
+        if self._ocupado:
+            return  # Ciclo anterior ainda esperando o compartilhamento
+        self._ocupado = True
+        self._pool.start(_TarefaAlteracoes(self))
+
+    def _verificar(self):
+        try:
+            versao = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if versao == self._versao:
+                return
+            self._versao = versao
+            seq, alterados, excluidos = self.db.alteracoes_desde(self._seq)
+            if seq != self._seq:
+                self._seq = seq
+                self._sinais.recebidas.emit(alterados, excluidos)
+        except sqlite3.Error:
+            self._versao = None  # Tenta de novo no próximo ciclo
+        finally:
+            self._ocupado = False
+
+class ExportacaoWorker(QtCore.QThread):
+    """Exporta para Excel em segundo plano, com progresso e cancelamento."""
+
+    progresso = QtCore.pyqtSignal(int, int)
+    concluida = QtCore.pyqtSignal(str, int)
+    cancelada = QtCore.pyqtSignal()
+    falhou = QtCore.pyqtSignal(str)
+
+    def __init__(self, db, nome_arquivo, criterio="ENTRADA", texto=None, inicio=None, fim=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.nome_arquivo = nome_arquivo
+        self.criterio = criterio
+        self.texto = texto
+        self.inicio = inicio
+        self.fim = fim
+        self._cancelar = False
+
+    def cancelar(self):
+        self._cancelar = True
+
+    def run(self):
+        try:
+            total = self.db.contar(self.texto, self.inicio, self.fim)
+            if not total:
+                self.concluida.emit("", 0)
+                return
+            self.progresso.emit(0, total)
+
+            def avisar(linhas):
+                self.progresso.emit(linhas, total)
+                return not self._cancelar
+
+            registros = self.db.iterar_registros(self.criterio, self.texto, self.inicio, self.fim)
             try:
-                registrar_log("ERRO", f"Falha ao excluir ID {id_registro}: {e}")
-            except Exception:
-                pass
-            return False
+                caminho, linhas = exportar_para_excel(registros, self.nome_arquivo, avisar)
+            finally:
+                registros.close()
+            if caminho is None:
+                self.cancelada.emit()
+            else:
+                registrar_log("EXPORTAR", f"Arquivo: {caminho}, Registros: {linhas}")
+                self.concluida.emit(caminho, linhas)
+        except Exception as e:
+            self.falhou.emit(str(e))
 
-class MplCanvas(FigureCanvas):
-    def __init__(self, width=12, height=8, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi, facecolor='#2d2d2d')
-        super().__init__(self.fig)
-        self.setParent(None)
+class ImportacaoWorker(QtCore.QThread):
+    """Importa uma planilha .xlsx em segundo plano, com progresso e cancelamento."""
+
+    progresso = QtCore.pyqtSignal(int, int)
+    concluida = QtCore.pyqtSignal(object)
+    falhou = QtCore.pyqtSignal(str)
+
+    def __init__(self, db, arquivo, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self.arquivo = arquivo
+        self._cancelar = False
+
+    def cancelar(self):
+        self._cancelar = True
+
+    def run(self):
+        def avisar(feitas, total):
+            self.progresso.emit(feitas, total)
+            return not self._cancelar
+
+        try:
+            self.concluida.emit(importar_planilha(self.db, self.arquivo, avisar))
+        except Exception as e:
+            self.falhou.emit(str(e))
+
+class BackupWorker(QtCore.QThread):
+    """Backup online (backup_banco) e poda das gerações, em segundo plano."""
+
+    concluido = QtCore.pyqtSignal(object, int)
+    falhou = QtCore.pyqtSignal(str)
+
+    def __init__(self, db_file, parent=None):
+        super().__init__(parent)
+        self.db_file = db_file
+        self._cancelar = False
+
+    def cancelar(self):
+        self._cancelar = True
+
+    def run(self):
+        try:
+            geracao = backup_banco(self.db_file, progresso=lambda restantes, total: not self._cancelar)
+            if geracao is None:
+                return
+            removidos = podar_backups()
+            registrar_log(
+                "BACKUP",
+                f"Geração: {geracao.nome}, Blocos novos: {geracao.novos}/{geracao.blocos}, "
+                f"Bytes gravados: {geracao.bytes_gravados}, Gerações removidas: {len(removidos)}"
+            )
+            self.concluido.emit(geracao, len(removidos))
+        except Exception as e:
+            self.falhou.emit(str(e))
+
+class BackupsDialog(QtWidgets.QDialog):
+    """Lista as gerações do ArmazemBackups e restaura uma delas em um arquivo."""
+
+    def __init__(self, armazem, parent=None):
+        super().__init__(parent)
+        self.armazem = armazem
+        self.setWindowTitle("Backups")
+        self.setMinimumSize(650, 400)
+        self.setModal(True)
+
+        layout = QtWidgets.QVBoxLayout()
+
+        self.tabela = QtWidgets.QTableWidget(0, 4)
+        self.tabela.setHorizontalHeaderLabels(["Geração", "Data", "Tamanho", "Gravado"])
+        self.tabela.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.tabela.setSelectionMode(QtWidgets.QAbstractItemView.SingleSelection)
+        self.tabela.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.tabela.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.Stretch)
+        layout.addWidget(self.tabela)
+
+        botoes = QtWidgets.QHBoxLayout()
+        btn_restaurar = QtWidgets.QPushButton("♻️ Restaurar em arquivo...")
+        btn_restaurar.clicked.connect(self.restaurar)
+        btn_fechar = QtWidgets.QPushButton("Fechar")
+        btn_fechar.clicked.connect(self.accept)
+        for btn in (btn_restaurar, btn_fechar):
+            btn.setStyleSheet("QPushButton { padding: 8px 20px; }")
+            botoes.addWidget(btn)
+        layout.addLayout(botoes)
+
+        self.setLayout(layout)
+        self.carregar()
+
+    def carregar(self):
+        self.geracoes = self.armazem.listar()
+        self.tabela.setRowCount(len(self.geracoes))
+        for row, geracao in enumerate(self.geracoes):
+            valores = [
+                geracao.nome, geracao.momento.strftime("%d/%m/%Y %H:%M:%S"),
+                formatar_tamanho(geracao.tamanho), formatar_tamanho(geracao.bytes_gravados),
+            ]
+            for col, valor in enumerate(valores):
+                self.tabela.setItem(row, col, QtWidgets.QTableWidgetItem(valor))
+
+    def restaurar(self):
+        row = self.tabela.currentRow()
+        if row < 0:
+            QtWidgets.QMessageBox.information(self, "Aviso", "Selecione uma geração para restaurar.")
+            return
+        geracao = self.geracoes[row]
+        destino, _ = QtWidgets.QFileDialog.getSaveFileName(
+            self, "Restaurar backup em", f"{geracao.nome}.db", "Banco SQLite (*.db)"
+        )
+        if not destino:
+            return
+        try:
+            self.armazem.restaurar(geracao.nome, destino)
+            registrar_log("RESTAURAR", f"Geração: {geracao.nome}, Arquivo: {destino}")
+            QtWidgets.QMessageBox.information(
+                self, "Backup restaurado",
+                f"Geração {geracao.nome} restaurada em:\n{destino}\n\n"
+                "Para usá-la, feche o sistema e aponte DB_PATH (db_config.txt) para esse arquivo."
+            )
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao restaurar backup:\n{str(e)}")
+
+class ExportacaoDialog(QtWidgets.QDialog):
+    """Escolhe o que exportar: tudo, a pesquisa atual ou um período de entrada."""
+
+    def __init__(self, texto_pesquisa="", parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Exportar para Excel")
+        self.setModal(True)
+        self.texto_pesquisa = texto_pesquisa
+
+        layout = QtWidgets.QVBoxLayout()
+
+        self.opcao_todos = QtWidgets.QRadioButton("Todos os registros")
+        self.opcao_pesquisa = QtWidgets.QRadioButton(
+            f"Resultado da pesquisa atual ('{texto_pesquisa}')" if texto_pesquisa else "Resultado da pesquisa atual"
+        )
+        self.opcao_periodo = QtWidgets.QRadioButton("Período de entrada:")
+        self.opcao_pesquisa.setEnabled(bool(texto_pesquisa))
+        (self.opcao_pesquisa if texto_pesquisa else self.opcao_todos).setChecked(True)
+
+        layout.addWidget(self.opcao_todos)
+        layout.addWidget(self.opcao_pesquisa)
+        layout.addWidget(self.opcao_periodo)
+
+        periodo_layout = QtWidgets.QHBoxLayout()
+        self.inicio = QtWidgets.QDateEdit()
+        self.inicio.setDate(QtCore.QDate.currentDate().addMonths(-1))
+        self.fim = QtWidgets.QDateEdit()
+        self.fim.setDate(QtCore.QDate.currentDate())
+        for widget in (self.inicio, self.fim):
+            widget.setCalendarPopup(True)
+            widget.setDisplayFormat("dd/MM/yyyy")
+        periodo_layout.addWidget(QtWidgets.QLabel("De:"))
+        periodo_layout.addWidget(self.inicio)
+        periodo_layout.addWidget(QtWidgets.QLabel("Até:"))
+        periodo_layout.addWidget(self.fim)
+        layout.addLayout(periodo_layout)
+
+        btn_layout = QtWidgets.QHBoxLayout()
+        btn_ok = QtWidgets.QPushButton("Exportar")
+        btn_cancel = QtWidgets.QPushButton("Cancelar")
+        btn_ok.setStyleSheet("QPushButton { background-color: #4CAF50; color: white; padding: 8px 20px; border: none; border-radius: 4px; }")
+        btn_cancel.setStyleSheet("QPushButton { background-color: #f44336; color: white; padding: 8px 20px; border: none; border-radius: 4px; }")
+        btn_ok.clicked.connect(self.accept)
+        btn_cancel.clicked.connect(self.reject)
+        btn_layout.addWidget(btn_ok)
+        btn_layout.addWidget(btn_cancel)
+        layout.addLayout(btn_layout)
+
+        self.setLayout(layout)
+
+    def get_filtros(self):
+        """Retorna (texto, inicio, fim) para DatabaseManager.iterar_registros."""
+        if self.opcao_pesquisa.isChecked():
+            return self.texto_pesquisa, None, None
+        if self.opcao_periodo.isChecked():
+            return None, self.inicio.date().toString("yyyy-MM-dd"), self.fim.date().toString("yyyy-MM-dd")
+        return None, None, None
 
 class Proximos7DiasDialog(QtWidgets.QDialog):
     def __init__(self, proximos):
@@ -414,6 +1025,118 @@ class Proximos7DiasDialog(QtWidgets.QDialog):
         
         self.setLayout(layout)
 
+class DatasInvalidasDialog(QtWidgets.QDialog):
+    """Registros com data de entrada inválida, que não aparecem nas abas."""
+
+    def __init__(self, db, editar=None, parent=None):
+        super().__init__(parent)
+        self.db = db
+        self._editar = editar
+        self.setWindowTitle("Datas Inválidas")
+        self.setMinimumSize(900, 400)
+        self.setModal(True)
+
+        layout = QtWidgets.QVBoxLayout()
+
+        self.label = QtWidgets.QLabel()
+        self.label.setStyleSheet("font-weight: bold; margin-bottom: 10px;")
+        layout.addWidget(self.label)
+
+        self.table = QtWidgets.QTableView()
+        self.table.setModel(RegistrosTableModel(self.table))
+        self.table.setAlternatingRowColors(True)
+        self.table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.table.setColumnHidden(0, True)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.doubleClicked.connect(self.editar_selecionado)
+        layout.addWidget(self.table)
+
+        botoes = QtWidgets.QHBoxLayout()
+        btn_editar = QtWidgets.QPushButton("✏️ Corrigir")
+        btn_editar.setEnabled(editar is not None)
+        btn_editar.clicked.connect(self.editar_selecionado)
+        btn_fechar = QtWidgets.QPushButton("Fechar")
+        btn_fechar.clicked.connect(self.accept)
+        for btn in (btn_editar, btn_fechar):
+            btn.setStyleSheet("QPushButton { padding: 8px 20px; }")
+            botoes.addWidget(btn)
+        layout.addLayout(botoes)
+
+        self.setLayout(layout)
+        self.carregar()
+
+    def carregar(self):
+        registros = self.db.datas_invalidas()
+        self.table.model().set_registros(registros)
+        if registros:
+            self.label.setText(f"{len(registros)} registro(s) com data de entrada inválida:")
+        else:
+            self.label.setText("🎉 Nenhum registro com data de entrada inválida!")
+
+    def editar_selecionado(self, *args):
+        index = self.table.currentIndex()
+        if self._editar is None or not index.isValid():
+            return
+        self._editar(self.table.model().data(index, QtCore.Qt.UserRole))
+        self.carregar()
+
+class HistoricoRegistroDialog(QtWidgets.QDialog):
+    """Linha do tempo de alterações de um registro (tabela auditoria)."""
+
+    OPERACOES = {"INSERIR": "➕ Inclusão", "ATUALIZAR": "✏️ Alteração", "EXCLUIR": "🗑️ Exclusão"}
+
+    def __init__(self, id_registro, eventos, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"Histórico do Registro #{id_registro}")
+        self.setMinimumSize(900, 400)
+        self.setModal(True)
+
+        layout = QtWidgets.QVBoxLayout()
+        label = QtWidgets.QLabel(f"{len(eventos)} evento(s) registrado(s):" if eventos
+                                 else "Nenhuma alteração registrada para este registro.")
+        label.setStyleSheet("font-weight: bold; margin-bottom: 10px;")
+        layout.addWidget(label)
+
+        table = QtWidgets.QTableWidget(len(eventos), 4)
+        table.setHorizontalHeaderLabels(["Data/Hora", "Operação", "Usuário", "Campos"])
+        table.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        table.setAlternatingRowColors(True)
+        table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        table.verticalHeader().setVisible(False)
+        for linha, evento in enumerate(eventos):
+            usuario = f"{evento.usuario or '?'}@{evento.host or '?'}"
+            valores = (evento.momento[:19], self.OPERACOES.get(evento.operacao, evento.operacao),
+                       usuario, self.descrever(evento))
+            for coluna, valor in enumerate(valores):
+                table.setItem(linha, coluna, QtWidgets.QTableWidgetItem(valor))
+        table.resizeColumnsToContents()
+        table.resizeRowsToContents()
+        table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(table)
+
+        btn_fechar = QtWidgets.QPushButton("Fechar")
+        btn_fechar.setStyleSheet("QPushButton { padding: 8px 20px; }")
+        btn_fechar.clicked.connect(self.accept)
+        layout.addWidget(btn_fechar, alignment=QtCore.Qt.AlignRight)
+        self.setLayout(layout)
+
+    @staticmethod
+    def descrever(evento):
+        """Campos alterados ("campo: antes → depois"); na inclusão/exclusão, os valores gravados."""
+        antes, depois = evento.antes or {}, evento.depois or {}
+        linhas = []
+        for campo in CAMPOS_AUDITORIA:
+            velho, novo = antes.get(campo), depois.get(campo)
+            if evento.antes is None:
+                if novo not in (None, ""):
+                    linhas.append(f"{campo}: {novo}")
+            elif evento.depois is None:
+                if velho not in (None, ""):
+                    linhas.append(f"{campo}: {velho}")
+            elif velho != novo:
+                linhas.append(f"{campo}: {'' if velho is None else velho} → {'' if novo is None else novo}")
+        return "\n".join(linhas)
+
 class EditDialog(QtWidgets.QDialog):
     def __init__(self, dados=None):
         super().__init__()
@@ -590,6 +1313,14 @@ class EditDialog(QtWidgets.QDialog):
 class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
 
     LOCK_FILE = os.path.join(os.path.dirname(DB_FILE), "db.lock")
+    INTERVALO_PROXIMOS_MS = 15 * 60 * 1000
+    INTERVALO_BACKUP_MS = 60 * 60 * 1000
+    INTERVALO_LOGS_MS = 2000
+    PAGINA_LOGS = 200
+    # Cada aba tem sua consulta: tamanho de página e, por data, a ordem
+    # (nas passadas a "data mais próxima" é a mais recente)
+    PAGINA_ABA = {"FUTURO": 200, "PASSADO": 100}
+    DECRESCENTE_ABA = {"FUTURO": False, "PASSADO": True}
 
     
     def check_lock(self):
@@ -665,6 +1396,8 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
 
     def __init__(self):
         super().__init__()
+        self.tempos_inicio = RelatorioInicio()
+        self.tempos_inicio.marcar("importacoes_e_qt")
         self.setWindowTitle("Multipool Olímpia - Sistema de Gestão")
         # Verificar se já existe um lock criado
         if self.check_lock():
@@ -685,19 +1418,57 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         if os.path.exists(LOGO_PATH):
             self.setWindowIcon(QtGui.QIcon(LOGO_PATH))
 
+        self.tempos_inicio.marcar("bloqueio")
+
         # Inicializar banco e variáveis
-        backup_banco()
         self.db = DatabaseManager(DB_FILE)
+        self.consultas = CacheConsultas(self.db)
         self.ultimo_excluido = None
         _, criterio = carregar_config()
         self.criterio_ordenacao = criterio
+        self.tempos_inicio.marcar("banco")
 
         # Criar interface
         self.setup_ui()
-        self.load_data()
         self.criar_toolbar()
         self.setup_shortcuts()
         self.atualizar_indicador_ordenacao()  # Inicializar indicador
+        self.tempos_inicio.marcar("interface")
+
+        # PC em modo leitura acompanha as gravações do outro (sequência anotada antes da carga)
+        self.observador = ObservadorAlteracoes(self.db, self) if self.read_only else None
+        # A janela abre só com a primeira página; o resto vai para a fila ociosa
+        self.load_data(contagens=False)
+        self.tempos_inicio.marcar("primeira_pagina")
+
+        # Alerta de próximas entradas: ao abrir e periodicamente, sem pop-up
+        self.timer_proximos = QtCore.QTimer(self)
+        self.timer_proximos.setInterval(self.INTERVALO_PROXIMOS_MS)
+        self.timer_proximos.timeout.connect(self.verificar_proximos)
+
+        # Backup online em segundo plano: logo após abrir e a cada hora
+        self.backup = None
+        self.timer_backup = QtCore.QTimer(self)
+        self.timer_backup.setInterval(self.INTERVALO_BACKUP_MS)
+        self.timer_backup.timeout.connect(self.fazer_backup)
+
+        self.fila_ociosa = FilaOciosa(self)
+        self.fila_ociosa.executada.connect(self.tempos_inicio.marcar)
+        self.fila_ociosa.concluida.connect(self.inicio_concluido)
+        self.fila_ociosa.agendar("exibicao", lambda: None)  # Marca o primeiro ciclo com a janela na tela
+        self.fila_ociosa.agendar("contagens", self.mostrar_contagens)
+        self.fila_ociosa.agendar("proximos", self.verificar_proximos)
+        self.fila_ociosa.agendar("timers", self.timer_proximos.start)
+        if self.observador is not None:
+            self.observador.alteracoes.connect(self.aplicar_alteracoes)
+            self.fila_ociosa.agendar("observador", self.observador.iniciar)
+        self.fila_ociosa.agendar("backup", self.fazer_backup)
+        self.fila_ociosa.agendar("timer_backup", self.timer_backup.start)
+
+    def inicio_concluido(self):
+        """Fim da abertura: grava no log o tempo de cada fase."""
+        self.fila_ociosa.concluida.disconnect(self.inicio_concluido)
+        registrar_log("INICIO", f"Abertura: {self.tempos_inicio.texto()}")
 
     def setup_ui(self):
         # Widget principal
@@ -749,6 +1520,8 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         self.setup_accounting_tab()
 
         self.tabs.setCurrentIndex(0)
+        self._passadas_pendentes = True
+        self.tabs.currentChanged.connect(self.aba_alterada)
 
     def setup_search_bar(self, parent_layout):
         """Configurar barra de pesquisa global"""
@@ -775,17 +1548,12 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
                 background-color: #3d3d3d;
             }
         """)
-        handler = getattr(self, 'filtrar_dados', None)
-        if handler is None:
-            def _noop():
-                try:
-                    self.load_data()
-                except Exception:
-                    pass
-            handler = _noop
-            self.filtrar_dados = handler
-        self.search_input.textChanged.connect(self.filtrar_dados)
-        self.search_input.returnPressed.connect(handler)
+        # Pesquisa com debounce em segundo plano
+        self.pesquisa = CoordenadorPesquisa(self.db, self)
+        self.pesquisa.resultado.connect(self.exibir_resultado_pesquisa)
+        self.pesquisa.erro.connect(self.exibir_erro_pesquisa)
+        self.search_input.textChanged.connect(self.pesquisa_alterada)
+        self.search_input.returnPressed.connect(self.filtrar_dados)
         
         self.btn_limpar_pesquisa = QtWidgets.QPushButton("✖ Limpar")
         self.btn_limpar_pesquisa.setMinimumHeight(40)
@@ -880,20 +1648,16 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         
         layout.addLayout(buttons_layout)
         
-        # Criar tabela
-        table = QtWidgets.QTableWidget()
-        table.setColumnCount(10)
-        table.setHorizontalHeaderLabels([
-            "ID", "Cotista", "Contato", "Empreendimento", 
-            "Entrada", "Saída", "Dormitório", "Valor", "Disponível", "Fonte"
-        ])
+        # Criar tabela (view virtual sobre o modelo de registros)
+        table = QtWidgets.QTableView()
+        table.setModel(RegistrosTableModel(table))
         
         # Configurar tabela
         table.setAlternatingRowColors(True)
         table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
         table.setSortingEnabled(False)
         table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 gridline-color: #3d3d3d;
                 selection-background-color: #4CAF50;
             }
@@ -927,7 +1691,7 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         table.setColumnHidden(0, True)
         
         # Conectar eventos
-        table.cellDoubleClicked.connect(self.editar)
+        table.doubleClicked.connect(self.editar)
         
         layout.addWidget(table)
         tab.setLayout(layout)
@@ -942,17 +1706,47 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         layout = QtWidgets.QVBoxLayout()
         layout.setSpacing(10)
         
+        # Filtros (aplicados no índice, sem reler os arquivos)
+        filtros_layout = QtWidgets.QHBoxLayout()
+        self.logs_acao = QtWidgets.QComboBox()
+        self.logs_acao.addItems(["Todas", "INSERIR", "ATUALIZAR", "EXCLUIR", "ERRO",
+                                 "IMPORTAR", "EXPORTAR", "BACKUP"])
+        self.logs_cotista = QtWidgets.QLineEdit()
+        self.logs_cotista.setPlaceholderText("Cotista (início do nome)")
+        self.logs_id = QtWidgets.QLineEdit()
+        self.logs_id.setPlaceholderText("ID")
+        self.logs_id.setValidator(QtGui.QIntValidator(0, 2**31 - 1, self.logs_id))
+        self.logs_id.setMaximumWidth(100)
+        filtros_layout.addWidget(QtWidgets.QLabel("Ação:"))
+        filtros_layout.addWidget(self.logs_acao)
+        filtros_layout.addWidget(QtWidgets.QLabel("Cotista:"))
+        filtros_layout.addWidget(self.logs_cotista, 1)
+        filtros_layout.addWidget(QtWidgets.QLabel("ID:"))
+        filtros_layout.addWidget(self.logs_id)
+
         # Botão refresh
         refresh_btn = QtWidgets.QPushButton("🔄 Atualizar Logs")
         refresh_btn.clicked.connect(self.carregar_logs)
         refresh_btn.setStyleSheet("QPushButton { padding: 8px 16px; }")
-        layout.addWidget(refresh_btn)
-        
-        # Text area para logs
-        self.logs_text = QtWidgets.QTextEdit()
-        self.logs_text.setReadOnly(True)
-        self.logs_text.setStyleSheet("""
-            QTextEdit {
+        filtros_layout.addWidget(refresh_btn)
+        layout.addLayout(filtros_layout)
+
+        self._timer_filtro_logs = QtCore.QTimer(self)
+        self._timer_filtro_logs.setSingleShot(True)
+        self._timer_filtro_logs.setInterval(250)
+        self._timer_filtro_logs.timeout.connect(self.carregar_logs)
+        self.logs_acao.currentIndexChanged.connect(self._timer_filtro_logs.start)
+        self.logs_cotista.textChanged.connect(self._timer_filtro_logs.start)
+        self.logs_id.textChanged.connect(self._timer_filtro_logs.start)
+        
+        # Tabela paginada: mais novos primeiro
+        self.logs_table = QtWidgets.QTableView()
+        self.logs_table.setModel(LogsTableModel(self.logs_table))
+        self.logs_table.setAlternatingRowColors(True)
+        self.logs_table.setSelectionBehavior(QtWidgets.QAbstractItemView.SelectRows)
+        self.logs_table.verticalHeader().setVisible(False)
+        self.logs_table.setStyleSheet("""
+            QTableView {
                 font-family: 'Consolas', 'Monaco', monospace;
                 font-size: 11px;
                 background-color: #1e1e1e;
@@ -960,10 +1754,23 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
                 border: 1px solid #3d3d3d;
             }
         """)
-        layout.addWidget(self.logs_text)
+        header = self.logs_table.horizontalHeader()
+        header.setSectionResizeMode(4, QtWidgets.QHeaderView.Stretch)  # Detalhes
+        self.logs_table.setColumnWidth(0, 150)
+        self.logs_table.setColumnWidth(1, 90)
+        self.logs_table.setColumnWidth(2, 60)
+        self.logs_table.setColumnWidth(3, 180)
+        self.logs_table.setColumnWidth(5, 150)
+        layout.addWidget(self.logs_table)
         
         self.logs_tab.setLayout(layout)
 
+        # Índice aberto quando a aba for usada; enquanto visível acompanha o arquivo do dia
+        self.indice_logs = None
+        self.timer_logs = QtCore.QTimer(self)
+        self.timer_logs.setInterval(self.INTERVALO_LOGS_MS)
+        self.timer_logs.timeout.connect(self.acompanhar_logs)
+
     def setup_accounting_tab(self):
         layout = QtWidgets.QVBoxLayout()
         layout.setSpacing(10)
@@ -997,16 +1804,43 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         layout.addLayout(filters_layout)
         # ====== fim filtros ======
 
+        # Resumo do período (preenchido por atualizar_graficos)
+        self.resumo_label = QtWidgets.QLabel()
+        self.resumo_label.setStyleSheet("color: white; font-weight: bold; margin: 5px;")
+        self.resumo_label.hide()
+        layout.addWidget(self.resumo_label)
+
         # Botão atualizar
         update_btn = QtWidgets.QPushButton("📈 Atualizar Gráficos")
-        update_btn.clicked.connect(self.atualizar_graficos)
+        update_btn.clicked.connect(lambda: self.atualizar_graficos())
         update_btn.setStyleSheet("QPushButton { padding: 8px 16px; }")
-        layout.addWidget(update_btn)
+
+        # Reparo do resumo mensal mantido pelos triggers
+        self.resumo_btn = QtWidgets.QPushButton("🧮 Reconstruir Resumo")
+        self.resumo_btn.setToolTip("Recalcula a tabela de resumo mensal a partir dos registros")
+        self.resumo_btn.clicked.connect(self.reconstruir_resumo)
+        self.resumo_btn.setStyleSheet("QPushButton { padding: 8px 16px; }")
+        self.resumo_btn.setEnabled(not getattr(self, "read_only", False))
+
+        botoes_layout = QtWidgets.QHBoxLayout()
+        botoes_layout.addWidget(update_btn, 1)
+        botoes_layout.addWidget(self.resumo_btn)
+        layout.addLayout(botoes_layout)
 
         # Canvas para gráficos
-        self.canvas = MplCanvas(width=14, height=10)
+        # Gráficos (artistas criados no primeiro desenho)
+        self.canvas = GraficosContabilidade(width=14, height=10)
         layout.addWidget(self.canvas)
 
+        # Com os gráficos já na tela, mexer nos filtros os atualiza direto
+        self.timer_graficos = QtCore.QTimer(self)
+        self.timer_graficos.setSingleShot(True)
+        self.timer_graficos.setInterval(30)
+        self.timer_graficos.timeout.connect(lambda: self.atualizar_graficos(silencioso=True))
+        for sinal in (self.filter_start.dateChanged, self.filter_end.dateChanged,
+                      self.filter_empreendimento.textChanged):
+            sinal.connect(self.filtros_graficos_alterados)
+
         self.accounting_tab.setLayout(layout)
 
     def criar_toolbar(self):
@@ -1078,9 +1912,21 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         stats_action.triggered.connect(self.mostrar_estatisticas)
         toolbar.addAction(stats_action)
         
-        alert_action = QtWidgets.QAction("⚠️ Próximos 7 Dias", self)
-        alert_action.triggered.connect(self.mostrar_alerta_proximos_7dias)
-        toolbar.addAction(alert_action)
+        self.alert_action = QtWidgets.QAction("⚠️ Próximos 7 Dias", self)
+        self.alert_action.triggered.connect(self.mostrar_alerta_proximos_7dias)
+        toolbar.addAction(self.alert_action)
+
+        invalidas_action = QtWidgets.QAction("🧹 Datas Inválidas", self)
+        invalidas_action.triggered.connect(self.mostrar_datas_invalidas)
+        toolbar.addAction(invalidas_action)
+
+        historico_action = QtWidgets.QAction("🕓 Histórico do Registro", self)
+        historico_action.triggered.connect(self.mostrar_historico)
+        toolbar.addAction(historico_action)
+
+        backups_action = QtWidgets.QAction("🗄️ Backups", self)
+        backups_action.triggered.connect(self.mostrar_backups)
+        toolbar.addAction(backups_action)
 
     def setup_shortcuts(self):
         # Atalhos adicionais
@@ -1143,111 +1989,173 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
                 self.remove_lock()
         except Exception:
             pass
+        try:
+            # Nada agendado pode começar depois daqui (ex.: o backup da fila ociosa)
+            self.fila_ociosa.parar()
+            self.timer_proximos.stop()
+            self.timer_backup.stop()
+            self.timer_logs.stop()
+            self.pesquisa.encerrar()
+            if getattr(self, "exportacao", None) is not None and self.exportacao.isRunning():
+                self.exportacao.cancelar()
+                self.exportacao.wait()
+            if getattr(self, "importacao", None) is not None and self.importacao.isRunning():
+                self.importacao.cancelar()
+                self.importacao.wait()
+            if self.backup is not None and self.backup.isRunning():
+                self.backup.cancelar()
+                self.backup.wait()
+            if self.observador is not None:
+                self.observador.parar()
+            self.consultas.fechar()
+            self.db.fechar()
+            if self.indice_logs is not None:
+                self.indice_logs.fechar()
+            encerrar_log()
+        except Exception:
+            pass
         event.accept()
 
     def get_current_table(self):
         return self.future_table if self.tabs.currentIndex() == 0 else self.past_table
 
-    def load_data(self):
+    def id_selecionado(self, table):
+        """Retorna o ID do registro selecionado na tabela (ou None)."""
+        index = table.currentIndex()
+        if not index.isValid():
+            return None
+        return table.model().data(index, QtCore.Qt.UserRole)
+
+    def separar_por_data(self, registros):
+        """Divide em (futuros, passados) resultados de pesquisa e linhas avulsas.
+
+        As abas em si são separadas no SQL (DatabaseManager.buscar_pagina).
+        """
+        hoje = datetime.date.today().isoformat()
+        futuros = []
+        passados = []
+        for registro in registros:
+            entrada = registro[4]
+            # Datas inválidas ficam de fora (ver DatabaseManager.datas_invalidas)
+            if not entrada or not _RE_DATA_ISO.match(entrada):
+                continue
+            try:
+                datetime.date.fromisoformat(entrada[:10])
+            except ValueError:
+                continue  # Mesmo critério de entrada_data (ex.: 2024-02-30)
+            if entrada[:10] >= hoje:
+                futuros.append(registro)
+            else:
+                passados.append(registro)
+        return futuros, passados
+
+    def load_data(self, contagens=True):
         try:
-            registros = self.db.buscar_ordenado(self.criterio_ordenacao)
-            hoje = datetime.date.today()
-            
-            # Salvar estado das colunas antes de limpar
-            future_widths = []
-            past_widths = []
-            
-            if hasattr(self, 'future_table'):
-                header = self.future_table.horizontalHeader()
-                for i in range(self.future_table.columnCount()):
-                    future_widths.append(header.sectionSize(i))
-            
-            if hasattr(self, 'past_table'):
-                header = self.past_table.horizontalHeader()
-                for i in range(self.past_table.columnCount()):
-                    past_widths.append(header.sectionSize(i))
-            
-            # Limpar tabelas
-            self.future_table.setRowCount(0)
-            self.past_table.setRowCount(0)
-            
-            for registro in registros:
-                try:
-                    data_entrada = datetime.datetime.strptime(registro[4][:10], "%Y-%m-%d").date()
-                    table = self.future_table if data_entrada >= hoje else self.past_table
-                    
-                    row = table.rowCount()
-                    table.insertRow(row)
-                    
-                    # Mostrar apenas os primeiros 10 campos (visíveis na tabela)
-                    for col, valor in enumerate(registro[:10]):
-                        if col == 4 or col == 5:  # Datas
-                            valor = formatar_data_display(valor)
-                        
-                        item = QtWidgets.QTableWidgetItem(str(valor) if valor else "")
-                        item.setData(QtCore.Qt.UserRole, registro[0])  # Armazenar ID
-                        
-                        # Colorir por disponibilidade
-                        if col == 8:  # Coluna Disponível
-                            if valor == "Não":
-                                item.setBackground(QtGui.QColor(255, 200, 200))
-                                item.setForeground(QtGui.QColor(0, 0, 0))  # Texto preto
-                            else:
-                                item.setBackground(QtGui.QColor(200, 255, 200))
-                                item.setForeground(QtGui.QColor(0, 0, 0))  # Texto preto
-                        
-                        table.setItem(row, col, item)
-                        
-                except (ValueError, IndexError):
-                    continue
-            
-            # Restaurar larguras das colunas
-            if future_widths and hasattr(self, 'future_table'):
-                header = self.future_table.horizontalHeader()
-                for i, width in enumerate(future_widths):
-                    if i < self.future_table.columnCount():
-                        header.resizeSection(i, width)
-            
-            if past_widths and hasattr(self, 'past_table'):
-                header = self.past_table.horizontalHeader()
-                for i, width in enumerate(past_widths):
-                    if i < self.past_table.columnCount():
-                        header.resizeSection(i, width)
-            
-            # Atualizar status
-            self.statusBar().showMessage(f"Carregados {len(registros)} registros")
-                    
+            # Só a primeira página das futuras; as passadas quando a aba for aberta
+            self._carregar_aba(self.future_table, "FUTURO")
+            self._passadas_pendentes = True
+            if self.tabs.currentWidget() is self.past_tab:
+                self._carregar_passadas()
+            if contagens:
+                self.mostrar_contagens()
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao carregar dados: {str(e)}")
-    def carregar_dados_filtrados(self, registros):
-        hoje = datetime.date.today()
-        self.future_table.setRowCount(0)
-        self.past_table.setRowCount(0)
-        for registro in registros:
+
+    def mostrar_contagens(self):
+        """Total de registros (e datas inválidas) na barra de status."""
+        mensagem = f"Carregados {self.consultas.contar()} registros"
+        invalidas = self.consultas.contar_datas_invalidas()
+        if invalidas:
+            mensagem += f" ({invalidas} com data de entrada inválida)"
+        self.statusBar().showMessage(mensagem)
+    def _carregar_aba(self, table, periodo):
+        criterio = self.criterio_ordenacao
+        decrescente = criterio == "ENTRADA" and self.DECRESCENTE_ABA[periodo]
+        hoje = datetime.date.today().isoformat()
+
+        def carregar(token):
+            return self.consultas.buscar_pagina(criterio, token, self.PAGINA_ABA[periodo], periodo, hoje, decrescente)
+        table.model().set_paginado(carregar, criterio, decrescente)
+
+    def _carregar_passadas(self):
+        self._passadas_pendentes = False
+        self._carregar_aba(self.past_table, "PASSADO")
+
+    def aba_alterada(self, indice):
+        if self.tabs.widget(indice) is self.logs_tab:
+            if self.indice_logs is None:
+                self.carregar_logs()
+            self.timer_logs.start()
+        else:
+            self.timer_logs.stop()
+        if self.tabs.widget(indice) is self.past_tab and self._passadas_pendentes:
+            if self.search_input.text().strip():
+                return  # Pesquisa ativa: a aba já mostra o resultado
             try:
-                data_entrada = datetime.datetime.strptime(str(registro[4])[:10], "%Y-%m-%d").date() if registro[4] else hoje
-                table = self.future_table if data_entrada >= hoje else self.past_table
-                row = table.rowCount()
-                table.insertRow(row)
-                for col, valor in enumerate(registro[:10]):
-                    v = valor
-                    if col in (4, 5) and valor:
-                        try:
-                            v = datetime.datetime.strptime(str(valor)[:10], "%Y-%m-%d").strftime("%d/%m/%Y")
-                        except Exception:
-                            v = str(valor)
-                    item = QtWidgets.QTableWidgetItem(str(v) if v is not None else "")
-                    item.setData(QtCore.Qt.UserRole, registro[0])
-                    if col == 8:
-                        if str(valor).strip().lower() == "não":
-                            item.setBackground(QtGui.QColor(255, 200, 200))
-                            item.setForeground(QtGui.QColor(0, 0, 0))
-                        else:
-                            item.setBackground(QtGui.QColor(200, 255, 200))
-                            item.setForeground(QtGui.QColor(0, 0, 0))
-                    table.setItem(row, col, item)
-            except Exception:
-                continue
+                self._carregar_passadas()
+            except Exception as e:
+                QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao carregar dados: {str(e)}")
+
+    def carregar_dados_filtrados(self, registros):
+        futuros, passados = self.separar_por_data(registros)
+        decrescente = self.criterio_ordenacao == "ENTRADA" and self.DECRESCENTE_ABA["PASSADO"]
+        if decrescente:
+            passados.reverse()
+        self.future_table.model().set_registros(futuros, self.criterio_ordenacao)
+        self.past_table.model().set_registros(passados, self.criterio_ordenacao, decrescente)
+        self._passadas_pendentes = True  # Ao limpar a pesquisa a aba volta a paginar
+
+    def aplicar_registro(self, antigo=None, novo=None, selecionar=True):
+        """Atualiza nas tabelas só a linha afetada, sem recarregar tudo.
+
+        Remove a versão antiga de onde estiver e insere a nova na posição
+        ordenada da aba certa (futuras/passadas), movendo-a se a entrada
+        cruzou a data de hoje.
+        """
+        if self.search_input.text().strip():
+            # Com pesquisa ativa a linha pode deixar de casar com o filtro
+            self.filtrar_dados()
+            return
+
+        if antigo is not None:
+            for table in (self.future_table, self.past_table):
+                if table.model().remover_registro(antigo):
+                    break
+
+        if novo is not None:
+            futuros, passados = self.separar_por_data([novo])
+            if self._passadas_pendentes:
+                passados = []  # Aba ainda não carregada: a linha vem na primeira página
+            for table, registros in ((self.future_table, futuros), (self.past_table, passados)):
+                for registro in registros:
+                    row = table.model().inserir_ordenado(registro)
+                    if row < 0 or not selecionar:
+                        continue  # Ainda não carregado: vem com a rolagem
+                    table.selectRow(row)
+                    table.scrollTo(table.model().index(row, 1))
+
+    def aplicar_alteracoes(self, alterados, excluidos):
+        """Aplica nas abas abertas o que o PC que grava alterou (modo leitura)."""
+        try:
+            if alterados is None:
+                self.load_data()
+                return
+            if self.search_input.text().strip():
+                self.filtrar_dados()
+            else:
+                novos = {registro[0]: registro for registro in alterados}
+                for id_registro in list(novos) + list(excluidos):
+                    antigo = None
+                    for table in (self.future_table, self.past_table):
+                        antigo = table.model().registro_por_id(id_registro)
+                        if antigo is not None:
+                            break
+                    self.aplicar_registro(antigo, novos.get(id_registro), selecionar=False)
+            self.verificar_proximos()
+            total = len(alterados) + len(excluidos)
+            self.statusBar().showMessage(f"{total} alteração(ões) recebida(s) de outro computador", 5000)
+        except Exception as e:
+            self.statusBar().showMessage(f"Falha ao atualizar a tela: {str(e)}", 5000)
 
 
     def adicionar(self):
@@ -1264,8 +2172,8 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
             dados = dialog.get_dados()
             if dados[0]:  # Cotista obrigatório
                 try:
-                    self.db.inserir(dados)
-                    self.load_data()
+                    novo = self.db.inserir(dados)
+                    self.aplicar_registro(novo=novo)
                     self.statusBar().showMessage("Registro adicionado com sucesso!")
                     self.session_dirty = True
                 except Exception as e:
@@ -1274,28 +2182,58 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
                 QtWidgets.QMessageBox.warning(self, "Aviso", "O campo Cotista é obrigatório!")
 
     def exportar_excel(self, automatico=False, sufixo=""):
-        try:
-            registros = self.db.buscar_ordenado(self.criterio_ordenacao)
-            if not registros:
-                if not automatico:
-                    QtWidgets.QMessageBox.information(self, "Aviso", "Nenhum registro encontrado para exportar!")
-                return
-            
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            nome_arquivo = f"multipool_export_{timestamp}{sufixo}"
-            
-            caminho = exportar_para_excel(registros, nome_arquivo)
+        """Exporta em segundo plano (todos, pesquisa atual ou período de entrada)."""
+        if getattr(self, "exportacao", None) is not None and self.exportacao.isRunning():
             if not automatico:
-                QtWidgets.QMessageBox.information(
-                    self, "Exportação Concluída", 
-                    f"Arquivo exportado com sucesso!\n\nLocal: {caminho}\nRegistros: {len(registros)}"
-                )
-                self.statusBar().showMessage(f"Exportados {len(registros)} registros para Excel")
-        except Exception as e:
+                QtWidgets.QMessageBox.information(self, "Aviso", "Já existe uma exportação em andamento.")
+            return
+
+        texto, inicio, fim = None, None, None
+        if not automatico:
+            dialog = ExportacaoDialog(self.search_input.text().strip(), self)
+            if dialog.exec_() != QtWidgets.QDialog.Accepted:
+                return
+            texto, inicio, fim = dialog.get_filtros()
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        nome_arquivo = f"multipool_export_{timestamp}{sufixo}"
+
+        self.exportacao = ExportacaoWorker(self.db, nome_arquivo, self.criterio_ordenacao, texto, inicio, fim, self)
+        self.exportacao.concluida.connect(lambda caminho, linhas: self.exportacao_concluida(caminho, linhas, automatico))
+        self.exportacao.falhou.connect(lambda erro: self.exportacao_falhou(erro, automatico))
+        self.exportacao.cancelada.connect(lambda: self.statusBar().showMessage("Exportação cancelada"))
+
+        if not automatico:
+            progress = QtWidgets.QProgressDialog("Exportando registros...", "Cancelar", 0, 0, self)
+            progress.setWindowModality(QtCore.Qt.NonModal)
+            progress.setMinimumDuration(500)
+            progress.canceled.connect(self.exportacao.cancelar)
+            self.exportacao.progresso.connect(lambda feitas, total: (progress.setMaximum(total), progress.setValue(feitas)))
+            self.exportacao.finished.connect(progress.close)
+        self.exportacao.start()
+        self.statusBar().showMessage("Exportando para Excel...")
+
+    def exportacao_concluida(self, caminho, linhas, automatico=False):
+        if not linhas:
             if not automatico:
-                QtWidgets.QMessageBox.critical(self, "Erro na Exportação", f"Erro ao exportar: {str(e)}")
+                QtWidgets.QMessageBox.information(self, "Aviso", "Nenhum registro encontrado para exportar!")
+            return
+        if not automatico:
+            QtWidgets.QMessageBox.information(
+                self, "Exportação Concluída", 
+                f"Arquivo exportado com sucesso!\n\nLocal: {caminho}\nRegistros: {linhas}"
+            )
+        self.statusBar().showMessage(f"Exportados {linhas} registros para Excel")
+
+    def exportacao_falhou(self, erro, automatico=False):
+        if not automatico:
+            QtWidgets.QMessageBox.critical(self, "Erro na Exportação", f"Erro ao exportar: {erro}")
 
     def importar_excel(self):
+        if getattr(self, "importacao", None) is not None and self.importacao.isRunning():
+            QtWidgets.QMessageBox.information(self, "Aviso", "Já existe uma importação em andamento.")
+            return
+
         # openpyxl não lê .xls — limitamos a .xlsx para evitar erros de importação
         arquivo, _ = QtWidgets.QFileDialog.getOpenFileName(
             self, "Selecionar arquivo Excel", "", "Arquivos Excel (*.xlsx)"
@@ -1304,324 +2242,179 @@ class MultipoolOlimpiaApp(QtWidgets.QMainWindow):
         if not arquivo:
             return
         
-        try:
-            wb = load_workbook(arquivo)
-            ws = wb.active
-            
-            registros_importados = 0
-            erros = []
-            
-            # Criar barra de progresso
-            progress = QtWidgets.QProgressDialog("Importando registros...", "Cancelar", 0, ws.max_row - 1, self)
-            progress.setWindowModality(QtCore.Qt.WindowModal)
-            
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                progress.setValue(row_num - 2)
-                
-                if progress.wasCanceled():
-                    break
-                
-                try:
-                    if not any(row[:7]):  # Pular linhas vazias
-                        continue
-                    
-                    cotista = str(row[0]).strip() if row[0] else ""
-                    contato = str(row[1]).strip() if row[1] else ""
-                    empreendimento = str(row[2]).strip() if row[2] else ""
-                    entrada = normalizar_data(row[3])
-                    saida = normalizar_data(row[4])
-                    dormitorio = str(row[5]).strip() if row[5] else ""
-                    valor = str(row[6]).strip() if row[6] else ""
-                    
-                    # Novas colunas
-                    disponivel = str(row[7]).strip() if len(row) > 7 and row[7] else "Sim"
-                    fonte = str(row[8]).strip() if len(row) > 8 and row[8] else "Cliente"
-                    
-                    # Campos internos (opcionais no Excel)
-                    numero_cota = str(row[9]).strip() if len(row) > 9 and row[9] else ""
-                    numero_apartamento = str(row[10]).strip() if len(row) > 10 and row[10] else ""
-                    torre = str(row[11]).strip() if len(row) > 11 and row[11] else ""
-                    letra_prioridade = str(row[12]).strip() if len(row) > 12 and row[12] else ""
-                    
-                    # Validar valores
-                    if disponivel not in ["Sim", "Não"]:
-                        disponivel = "Sim"
-                    if fonte not in ["Cliente", "Lead Internet", "Terceiros"]:
-                        fonte = "Cliente"
-                    
-                    if not cotista:
-                        erros.append(f"Linha {row_num}: Campo Cotista é obrigatório")
-                        continue
-                    
-                    dados = [cotista, contato, empreendimento, entrada, saida, dormitorio, valor, disponivel, fonte, numero_cota, numero_apartamento, torre, letra_prioridade]
-                    
-                    if not self.db.existe_duplicata(cotista, entrada, empreendimento):
-                        self.db.inserir(dados)
-                        registros_importados += 1
-                    else:
-                        erros.append(f"Linha {row_num}: Duplicata - {cotista} em {formatar_data_display(entrada)}")
-                        
-                except Exception as e:
-                    erros.append(f"Linha {row_num}: {str(e)}")
-            
-            progress.close()
-            self.load_data()
-            
-            # Relatório da importação
-            mensagem = f"Importação concluída!\n\nRegistros importados: {registros_importados}"
-            if erros:
-                mensagem += f"\nErros encontrados: {len(erros)}"
-                if len(erros) <= 15:
-                    mensagem += "\n\nDetalhes dos erros:\n" + "\n".join(erros)
-                else:
-                    mensagem += f"\n\nPrimeiros 15 erros:\n" + "\n".join(erros[:15])
-                    mensagem += f"\n... e mais {len(erros) - 15} erros."
-            
-            QtWidgets.QMessageBox.information(self, "Resultado da Importação", mensagem)
-            self.statusBar().showMessage(f"Importados {registros_importados} registros")
-            if registros_importados > 0:
-                self.session_dirty = True
-            
-        except Exception as e:
-            QtWidgets.QMessageBox.critical(self, "Erro na Importação", f"Erro ao importar arquivo:\n{str(e)}")
+        # Barra de progresso atualizada a cada lote lido
+        progress = QtWidgets.QProgressDialog("Importando registros...", "Cancelar", 0, 0, self)
+        progress.setWindowModality(QtCore.Qt.WindowModal)
+        progress.setMinimumDuration(0)
+
+        def atualizar_progresso(feitas, total):
+            if total:
+                progress.setMaximum(total)
+                progress.setValue(min(feitas, total))
+
+        self.importacao = ImportacaoWorker(self.db, arquivo, self)
+        self.importacao.progresso.connect(atualizar_progresso)
+        self.importacao.concluida.connect(self.importacao_concluida)
+        self.importacao.falhou.connect(
+            lambda erro: QtWidgets.QMessageBox.critical(self, "Erro na Importação", f"Erro ao importar arquivo:\n{erro}")
+        )
+        progress.canceled.connect(self.importacao.cancelar)
+        self.importacao.finished.connect(progress.close)
+        self.importacao.start()
+        self.statusBar().showMessage("Importando registros...")
+
+    def importacao_concluida(self, resultado):
+        self.load_data()
+        
+        # Relatório da importação
+        registros_importados = resultado.importados
+        mensagem = f"Importação concluída!\n\nRegistros importados: {registros_importados}"
+        if resultado.cancelado:
+            mensagem += "\n(Importação interrompida pelo usuário)"
+        if resultado.duplicatas:
+            mensagem += f"\nDuplicatas ignoradas: {len(resultado.duplicatas)}"
+            detalhes = [
+                f"Linha {linha}: {dados[0]} em {formatar_data_display(dados[3])}"
+                for linha, dados in resultado.duplicatas[:15]
+            ]
+            mensagem += "\n" + "\n".join(detalhes)
+            if len(resultado.duplicatas) > 15:
+                mensagem += f"\n... e mais {len(resultado.duplicatas) - 15} duplicatas."
+        erros = resultado.erros
+        if erros:
+            mensagem += f"\n\nErros encontrados: {len(erros)}"
+            if len(erros) <= 15:
+                mensagem += "\n\nDetalhes dos erros:\n" + "\n".join(erros)
+            else:
+                mensagem += f"\n\nPrimeiros 15 erros:\n" + "\n".join(erros[:15])
+                mensagem += f"\n... e mais {len(erros) - 15} erros."
+        
+        QtWidgets.QMessageBox.information(self, "Resultado da Importação", mensagem)
+        self.statusBar().showMessage(f"Importados {registros_importados} registros")
+        if registros_importados > 0:
+            self.session_dirty = True
 
     def carregar_logs(self):
         try:
-            logs_content = ""
-            
-            if os.path.exists(LOG_DIR):
-                log_files = sorted([f for f in os.listdir(LOG_DIR) if f.endswith('.txt')], reverse=True)
-                
-                if log_files:
-                    for log_file in log_files[:10]:  # Últimos 10 arquivos
-                        log_path = os.path.join(LOG_DIR, log_file)
-                        with open(log_path, 'r', encoding='utf-8') as f:
-                            logs_content += f"{'='*50}\n{log_file}\n{'='*50}\n"
-                            logs_content += f.read()
-                            logs_content += "\n\n"
-                else:
-                    logs_content = "Nenhum arquivo de log encontrado."
-            else:
-                logs_content = "Diretório de logs não existe ainda.\nOs logs serão criados quando você fizer alterações nos dados."
-            
-            self.logs_text.setPlainText(logs_content)
+            if self.indice_logs is None:
+                self.indice_logs = IndiceLogs(LOG_DIR)
+            self.indice_logs.atualizar()
+
+            acao = self.logs_acao.currentText()
+            acao = None if acao == "Todas" else acao
+            cotista = self.logs_cotista.text().strip() or None
+            id_texto = self.logs_id.text().strip()
+            id_registro = int(id_texto) if id_texto else None
+            indice = self.indice_logs
+
+            def carregar(token):
+                return indice.pagina(token, self.PAGINA_LOGS, acao, cotista, id_registro)
+
+            self.logs_table.model().set_paginado(carregar)
             self.statusBar().showMessage("Logs atualizados")
             
         except Exception as e:
-            self.logs_text.setPlainText(f"Erro ao carregar logs:\n{str(e)}")
+            QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao carregar logs:\n{str(e)}")
 
-    def atualizar_graficos(self):
+    def acompanhar_logs(self):
+        """Indexa as linhas novas; se a lista está no topo, mostra-as na hora."""
+        if self.indice_logs is None or self.tabs.currentWidget() is not self.logs_tab:
+            return
         try:
-            registros = self.db.buscar_ordenado("ENTRADA")
+            novas = self.indice_logs.atualizar()
+        except sqlite3.Error:
+            return
+        if not novas:
+            return
+        if self.logs_table.verticalScrollBar().value() == 0:
+            self.carregar_logs()
+        else:
+            self.statusBar().showMessage(f"{novas} nova(s) entrada(s) no histórico", 5000)
 
-            # Aplicar filtros escolhidos na aba
-            start_date = self.filter_start.date().toPyDate()
-            end_date = self.filter_end.date().toPyDate()
-            empreendimento_filtro = self.filter_empreendimento.text().strip().lower()
+    def reconstruir_resumo(self):
+        if getattr(self, "read_only", False):
+            return
+        try:
+            QtWidgets.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+            try:
+                grupos = self.db.reconstruir_resumo()
+            finally:
+                QtWidgets.QApplication.restoreOverrideCursor()
+            self.statusBar().showMessage(f"Resumo mensal reconstruído ({grupos} grupos)")
+            self.atualizar_graficos()
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao reconstruir resumo:\n{str(e)}")
 
-            # Filtrar registros
-            filtrados = []
-            for r in registros:
-                try:
-                    data_entrada = datetime.datetime.strptime(r[4][:10], "%Y-%m-%d").date()
-                    if not (start_date <= data_entrada <= end_date):
-                        continue
-                    if empreendimento_filtro and empreendimento_filtro not in (r[3] or "").lower():
-                        continue
-                    filtrados.append(r)
-                except:
-                    pass
-            # Agora sim, depois do loop
-            registros = filtrados
-
-            # Remover resumo antigo (se existir)
-            if hasattr(self, "resumo_label"):
-                self.resumo_label.setParent(None)
-
-            # Calcular valor total
-            total_valor = 0
-            for r in registros:
-                try:
-                    valor_str = str(r[7]).replace(',', '.').replace('R$', '').strip()
-                    total_valor += float(valor_str) if valor_str else 0
-                except:
-                    pass
-            
-            # Criar label de resumo
-            resumo_texto = f"Registros: {len(registros)}  |  Valor Total: R$ {total_valor:,.2f}"
-            self.resumo_label = QtWidgets.QLabel(resumo_texto)
-            self.resumo_label.setStyleSheet("color: white; font-weight: bold; margin: 5px;")
-            self.accounting_tab.layout().insertWidget(1, self.resumo_label)
+    def filtros_graficos_alterados(self, *args):
+        if self.canvas.fig is not None:
+            self.timer_graficos.start()  # Junta as mudanças seguidas num só redesenho
 
-            if not registros:
+    def atualizar_graficos(self, silencioso=False):
+        try:
+            # Aplicar filtros escolhidos na aba: série já agregada pelo banco
+            start_date = self.filter_start.date().toString("yyyy-MM-dd")
+            end_date = self.filter_end.date().toString("yyyy-MM-dd")
+            empreendimento_filtro = self.filter_empreendimento.text().strip()
+            serie = self.consultas.serie_mensal(start_date, end_date, empreendimento_filtro)
+
+            # Totais do período
+            total_registros = sum(linha.quantidade for linha in serie)
+            total_valor = sum(linha.valor_centavos for linha in serie) / 100
+            self.resumo_label.setText(f"Registros: {total_registros}  |  Valor Total: R$ {total_valor:,.2f}")
+            self.resumo_label.show()
+
+            if not total_registros and not silencioso:
                 QtWidgets.QMessageBox.information(self, "Aviso", "Nenhum dado encontrado para gerar gráficos.")
                 return
             
-            # Preparar dados para os gráficos
-            from collections import defaultdict
+            # Preparar dados para os gráficos (poucos grupos, não registros)
             dados_por_mes = defaultdict(int)
             dados_disponibilidade = {"Sim": 0, "Não": 0}
             dados_fonte = {"Cliente": 0, "Lead Internet": 0, "Terceiros": 0}
-            valores_por_mes = defaultdict(float)
-
-            for registro in registros:
-                try:
-                    data_entrada = datetime.datetime.strptime(registro[4][:10], "%Y-%m-%d").date()
-                    mes_ano = data_entrada.strftime("%Y-%m")
-                    dados_por_mes[mes_ano] += 1
-
-                    # Disponibilidade
-                    disponivel = registro[8] if len(registro) > 8 and registro[8] else "Sim"
-                    if disponivel in dados_disponibilidade:
-                        dados_disponibilidade[disponivel] += 1
-
-                    # Fonte
-                    fonte = registro[9] if len(registro) > 9 and registro[9] else "Cliente"
-                    if fonte in dados_fonte:
-                        dados_fonte[fonte] += 1
-
-                    # Valor
-                    valor_str = str(registro[7]).replace(',', '.').replace('R$', '').strip()
-                    valor = float(valor_str) if valor_str else 0
-                    valores_por_mes[mes_ano] += valor
-                
-                except (ValueError, IndexError):
-                    continue
-
-            # Limpar e configurar figura
-            self.canvas.fig.clear()
-            self.canvas.fig.patch.set_facecolor('#2d2d2d')
-
-            if sum(dados_por_mes.values()) > 0:
-                import matplotlib.pyplot as plt
-                plt.rcParams.update({
-                    "text.color": "white",
-                    "axes.labelcolor": "white",
-                    "axes.edgecolor": "white",
-                    "xtick.color": "white",
-                    "ytick.color": "white",
-                    "axes.titleweight": "bold",
-                    "axes.titlecolor": "white",
-                    "font.size": 11
-                })
-                
-            # ---------- Gráfico 1: Registros por mês ----------
-            ax1 = self.canvas.fig.add_subplot(2, 2, 1, facecolor='#2d2d2d')
-            meses = sorted(dados_por_mes.keys())[-12:]
-            valores = [dados_por_mes[mes] for mes in meses]
-
-            bars = ax1.bar(meses, valores, color='#4CAF50', alpha=0.85, edgecolor='white')
-            ax1.set_title('Registros por Mês', fontsize=13, color='white', pad=12)
-            ax1.set_ylabel('Quantidade', color='white')
-            ax1.tick_params(axis='x', rotation=30)
-            for spine in ["top", "right"]:
-                ax1.spines[spine].set_visible(False)
-            for bar, valor in zip(bars, valores):
-                ax1.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.1,
-                         str(valor), ha='center', va='bottom', color='white', fontsize=9)
-            
-            # ---------- Gráfico 2: Disponibilidade ----------
-            ax2 = self.canvas.fig.add_subplot(2, 2, 2, facecolor='#2d2d2d')
-            if sum(dados_disponibilidade.values()) > 0:
-                wedges, texts, autotexts = ax2.pie(
-                    dados_disponibilidade.values(),
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    colors=['#4CAF50', '#f44336'],
-                    wedgeprops={'edgecolor': 'white'}
-                )
-                ax2.set_title('Disponibilidade', fontsize=13, color='white', pad=12)
-                ax2.legend(dados_disponibilidade.keys(), loc="center left", bbox_to_anchor=(1, 0.5))
-                for autotext in autotexts:
-                    autotext.set_color("white")
-                    autotext.set_fontweight("bold")
-            
-            # ---------- Gráfico 3: Fontes ----------
-            ax3 = self.canvas.fig.add_subplot(2, 2, 3, facecolor='#2d2d2d')
-            if sum(dados_fonte.values()) > 0:
-                wedges, texts, autotexts = ax3.pie(
-                    dados_fonte.values(),
-                    autopct='%1.1f%%',
-                    startangle=90,
-                    colors=['#FF9800', '#2196F3', '#9C27B0'],
-                    wedgeprops={'edgecolor': 'white'}
-                )
-                ax3.set_title('Fontes', fontsize=13, color='white', pad=12)
-                ax3.legend(dados_fonte.keys(), loc="center left", bbox_to_anchor=(1, 0.5))
-                for autotext in autotexts:
-                    autotext.set_color("white")
-                    autotext.set_fontweight("bold")
-            
-            # ---------- Gráfico 4: Valores por mês ----------
-            ax4 = self.canvas.fig.add_subplot(2, 2, 4, facecolor='#2d2d2d')
-            if valores_por_mes:
-                valores_mes = [valores_por_mes[mes] for mes in meses]
-                ax4.plot(meses, valores_mes, marker='o', color='#00BCD4', linewidth=2, markersize=6)
-                ax4.set_title('Valores por Mês (R$)', fontsize=13, color='white', pad=12)
-                ax4.set_ylabel('Valor (R$)', color='white')
-                ax4.tick_params(axis='x', rotation=30)
-                for spine in ["top", "right"]:
-                    ax4.spines[spine].set_visible(False)
-                ax4.grid(True, alpha=0.2, color='white')
-
-            self.canvas.fig.tight_layout(pad=2.0)
-            self.canvas.draw()
-            self.statusBar().showMessage("Gráficos atualizados")
+            centavos_por_mes = defaultdict(int)
+
+            for linha in serie:
+                dados_por_mes[linha.mes] += linha.quantidade
+
+                # Disponibilidade
+                disponivel = linha.disponivel or "Sim"
+                if disponivel in dados_disponibilidade:
+                    dados_disponibilidade[disponivel] += linha.quantidade
+
+                # Fonte
+                fonte = linha.fonte or "Cliente"
+                if fonte in dados_fonte:
+                    dados_fonte[fonte] += linha.quantidade
+
+                # Valor
+                centavos_por_mes[linha.mes] += linha.valor_centavos
+
+            meses = sorted(dados_por_mes.keys())[-GraficosContabilidade.MAX_MESES:]
+            self.canvas.atualizar(
+                meses,
+                [dados_por_mes[mes] for mes in meses],
+                [centavos_por_mes[mes] / 100 for mes in meses],
+                dados_disponibilidade,
+                dados_fonte,
+            )
+            if not silencioso:
+                self.statusBar().showMessage("Gráficos atualizados")
 
         except Exception as e:
+            if silencioso:
+                self.statusBar().showMessage(f"Erro ao gerar gráficos: {e}", 5000)
+                return
             QtWidgets.QMessageBox.critical(self, "Erro nos Gráficos", f"Erro ao gerar gráficos:\n{str(e)}")
     
     def mostrar_estatisticas(self):
         try:
-            registros = self.db.buscar_ordenado("ENTRADA")
-            hoje = datetime.date.today()
-            
-            # Contadores
-            total_registros = len(registros)
-            futuras = passadas = proximos_7_dias = 0
-            disponivel_sim = disponivel_nao = 0
-            fonte_cliente = fonte_lead = fonte_terceiros = 0
-            valor_total = 0
-            
-            for registro in registros:
-                try:
-                    data_entrada = datetime.datetime.strptime(registro[4][:10], "%Y-%m-%d").date()
-                    dias_diferenca = (data_entrada - hoje).days
-                    
-                    # Contagem temporal
-                    if dias_diferenca >= 0:
-                        futuras += 1
-                        if 0 <= dias_diferenca <= 7:
-                            proximos_7_dias += 1
-                    else:
-                        passadas += 1
-                    
-                    # Disponibilidade
-                    disp = registro[8] if len(registro) > 8 and registro[8] else "Sim"
-                    if disp == "Sim":
-                        disponivel_sim += 1
-                    else:
-                        disponivel_nao += 1
-                    
-                    # Fonte
-                    fonte = registro[9] if len(registro) > 9 and registro[9] else "Cliente"
-                    if fonte == "Cliente":
-                        fonte_cliente += 1
-                    elif fonte == "Lead Internet":
-                        fonte_lead += 1
-                    else:
-                        fonte_terceiros += 1
-                    
-                    # Valor
-                    try:
-                        valor_str = str(registro[7]).replace(',', '.').replace('R$', '').strip()
-                        valor = float(valor_str) if valor_str else 0
-                        valor_total += valor
-                    except:
-                        pass
-                        
-                except (ValueError, IndexError):
-                    passadas += 1
+            # Todos os contadores vêm agregados do SQLite
+            est = self.consultas.estatisticas(datetime.date.today())
+            total_registros = est.total
+            futuras, passadas, proximos_7_dias = est.futuras, est.passadas, est.proximos_7_dias
+            disponivel_sim, disponivel_nao = est.disponivel_sim, est.disponivel_nao
+            fonte_cliente, fonte_lead, fonte_terceiros = est.fonte_cliente, est.fonte_lead, est.fonte_terceiros
+            valor_total = est.valor_total
             
             estatisticas = f"""
 📊 ESTATÍSTICAS GERAIS
@@ -1684,35 +2477,24 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
 
     def mostrar_alerta_proximos_7dias(self):
         try:
-            registros = self.db.buscar_ordenado("ENTRADA")
-            hoje = datetime.date.today()
+            registros = self.consultas.proximos(7)
+            self._atualizar_indicador_proximos(registros)
             proximos = []
             
             for registro in registros:
-                try:
-                    data_entrada = datetime.datetime.strptime(registro[4][:10], "%Y-%m-%d").date()
-                    dias_diferenca = (data_entrada - hoje).days
-                    
-                    if 0 <= dias_diferenca <= 7:
-                        disponivel = registro[8] if len(registro) > 8 and registro[8] else "Sim"
-                        fonte = registro[9] if len(registro) > 9 and registro[9] else "Cliente"
-                        
-                        status_icon = "🟢" if disponivel == "Sim" else "🔴"
-                        fonte_icon = {"Cliente": "👤", "Lead Internet": "🌐", "Terceiros": "🤝"}.get(fonte, "❓")
-                        
-                        info = f"{status_icon} {formatar_data_display(registro[4])} - {registro[1]} ({registro[3]})"
-                        info += f"\n   📞 {registro[2]} | 🏠 {registro[6]} | 💰 {registro[7]}"
-                        info += f"\n   {fonte_icon} {fonte} | ⏰ Em {dias_diferenca} dia(s)"
-                        
-                        if dias_diferenca == 0:
-                            info += " (HOJE!)"
-                        elif dias_diferenca == 1:
-                            info += " (AMANHÃ!)"
-                        
-                        proximos.append(info)
-                        
-                except (ValueError, IndexError):
-                    continue
+                status_icon = "🟢" if registro.disponivel == "Sim" else "🔴"
+                fonte_icon = {"Cliente": "👤", "Lead Internet": "🌐", "Terceiros": "🤝"}.get(registro.fonte, "❓")
+                
+                info = f"{status_icon} {formatar_data_display(registro.entrada)} - {registro.cotista} ({registro.empreendimento})"
+                info += f"\n   📞 {registro.contato} | 🏠 {registro.dormitorio} | 💰 {registro.valor}"
+                info += f"\n   {fonte_icon} {registro.fonte} | ⏰ Em {registro.dias} dia(s)"
+                
+                if registro.dias == 0:
+                    info += " (HOJE!)"
+                elif registro.dias == 1:
+                    info += " (AMANHÃ!)"
+                
+                proximos.append(info)
             
             if proximos:
                 dialog = Proximos7DiasDialog(proximos)
@@ -1726,6 +2508,66 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao verificar próximos 7 dias:\n{str(e)}")
 
+    def fazer_backup(self):
+        if self.backup is not None and self.backup.isRunning():
+            return
+        self.backup = BackupWorker(DB_FILE, self)
+        self.backup.concluido.connect(self.backup_concluido)
+        self.backup.falhou.connect(
+            lambda erro: self.statusBar().showMessage(f"Falha no backup: {erro}", 10000)
+        )
+        self.backup.start()
+
+    def backup_concluido(self, geracao, removidos):
+        mensagem = (
+            f"Backup concluído e verificado: {geracao.nome} "
+            f"({formatar_tamanho(geracao.bytes_gravados)} novos)"
+        )
+        if removidos:
+            mensagem += f" ({removidos} geração(ões) antiga(s) removida(s))"
+        self.statusBar().showMessage(mensagem, 10000)
+
+    def mostrar_backups(self):
+        try:
+            BackupsDialog(ArmazemBackups(), self).exec_()
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao listar backups:\n{str(e)}")
+
+    def mostrar_historico(self):
+        id_registro = self.id_selecionado(self.get_current_table())
+        if id_registro is None:
+            QtWidgets.QMessageBox.information(self, "Aviso", "Selecione um registro para ver o histórico.")
+            return
+        try:
+            HistoricoRegistroDialog(id_registro, self.db.historico(id_registro), self).exec_()
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao carregar histórico:\n{str(e)}")
+
+    def mostrar_datas_invalidas(self):
+        try:
+            editar = None if self.read_only else self.editar_registro
+            DatasInvalidasDialog(self.db, editar, self).exec_()
+        except Exception as e:
+            QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao listar datas inválidas:\n{str(e)}")
+
+    def verificar_proximos(self):
+        """Checagem silenciosa (início e timer): só atualiza a ação e a barra de status."""
+        try:
+            self._atualizar_indicador_proximos(self.consultas.proximos(7))
+        except sqlite3.Error:
+            pass  # Banco ocupado/indisponível: tenta de novo no próximo ciclo
+
+    def _atualizar_indicador_proximos(self, registros):
+        hoje = sum(1 for r in registros if r.dias == 0)
+        if registros:
+            self.alert_action.setText(f"⚠️ Próximos 7 Dias ({len(registros)})")
+            mensagem = f"{len(registros)} entrada(s) nos próximos 7 dias"
+            if hoje:
+                mensagem += f", {hoje} hoje"
+            self.statusBar().showMessage(mensagem, 10000)
+        else:
+            self.alert_action.setText("⚠️ Próximos 7 Dias")
+
     def ordenar_por_data(self):
         """Ordenar registros por data de entrada (mais próxima primeiro)"""
         try:
@@ -1772,11 +2614,11 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
             if hasattr(self, 'search_input') and self.search_input is not None:
                 if self.search_input.text():
                     self.search_input.clear()
+                else:
+                    # Com o campo já vazio não há textChanged; recarregar aqui
+                    self.load_data()
                 # Reposiciona o foco no campo para facilitar nova busca
                 self.search_input.setFocus()
-            # Recarrega todos os dados
-            if hasattr(self, 'load_data'):
-                self.load_data()
             # Feedback ao usuário
             try:
                 sb = self.statusBar()
@@ -1808,8 +2650,17 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Erro", f"Erro ao salvar configuração:\n{str(e)}")
 
+    def pesquisa_alterada(self, texto):
+        """A cada tecla: agenda a pesquisa (debounce) ou volta à lista completa."""
+        if texto.strip():
+            self.pesquisa.solicitar(texto.lower().strip(), self.criterio_ordenacao)
+            self.statusBar().showMessage("Pesquisando...")
+        else:
+            self.pesquisa.cancelar()
+            self.load_data()  # Mostrar todos os dados
+
     def filtrar_dados(self):
-        """Filtrar dados baseado no texto de pesquisa"""
+        """Filtrar dados baseado no texto de pesquisa, sem esperar o debounce"""
         try:
             if not hasattr(self, 'search_input'):
                 return
@@ -1817,48 +2668,26 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
             texto_pesquisa = self.search_input.text().lower().strip()
             
             if not texto_pesquisa:
+                self.pesquisa.cancelar()
                 self.load_data()  # Mostrar todos os dados
                 return
             
-            # Buscar todos os registros incluindo campos internos
-            todos_registros = self.db.buscar_ordenado(self.criterio_ordenacao)
-            registros_filtrados = []
-            
-            for registro in todos_registros:
-                campos_busca = [
-                    str(registro[1]) if registro[1] else "",  # cotista
-                    str(registro[2]) if registro[2] else "",  # contato
-                    str(registro[3]) if registro[3] else "",  # empreendimento
-                    str(registro[4]) if registro[4] else "",  # entrada
-                    str(registro[5]) if registro[5] else "",  # saida
-                    str(registro[6]) if registro[6] else "",  # dormitorio
-                    str(registro[7]) if registro[7] else "",  # valor
-                    str(registro[8]) if registro[8] else "",  # disponivel
-                    str(registro[9]) if registro[9] else "",  # fonte
-                    str(registro[10]) if len(registro) > 10 and registro[10] else "",  # numero_cota
-                    str(registro[11]) if len(registro) > 11 and registro[11] else "",  # numero_apartamento
-                    str(registro[12]) if len(registro) > 12 and registro[12] else "",  # torre
-                    str(registro[13]) if len(registro) > 13 and registro[13] else "",  # letra_prioridade
-                ]
-                
-                # Verificar se o texto de pesquisa está em algum campo
-                if any(texto_pesquisa in campo.lower() for campo in campos_busca):
-                    registros_filtrados.append(registro)
-            
-            # Método mais simples: recarregar tudo com filtro
-            self.carregar_dados_filtrados(registros_filtrados)
-            
-            # Atualizar status
-            total_encontrados = len(registros_filtrados)
-            if hasattr(self, 'statusBar') and self.statusBar():
-                self.statusBar().showMessage(f"Pesquisa: '{texto_pesquisa}' - {total_encontrados} registro(s) encontrado(s)")
+            # Consulta no índice de pesquisa (FTS5), fora da thread da interface
+            self.pesquisa.executar_agora(texto_pesquisa, self.criterio_ordenacao)
             
         except Exception as e:
             QtWidgets.QMessageBox.critical(self, "Erro", f"Erro na pesquisa:\n{str(e)}")
 
+    def exibir_resultado_pesquisa(self, texto_pesquisa, registros_filtrados):
+        """Recebe do coordenador o resultado da pesquisa mais recente."""
+        self.carregar_dados_filtrados(registros_filtrados)
+        
+        # Atualizar status
+        total_encontrados = len(registros_filtrados)
+        self.statusBar().showMessage(f"Pesquisa: '{texto_pesquisa}' - {total_encontrados} registro(s) encontrado(s)")
 
-
-
+    def exibir_erro_pesquisa(self, texto_pesquisa, mensagem):
+        QtWidgets.QMessageBox.critical(self, "Erro", f"Erro na pesquisa:\n{mensagem}")
 
     def editar(self, *args, **kwargs):
         if self.read_only:
@@ -1870,20 +2699,16 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
             return
 
         table = self.get_current_table()
-        current_row = table.currentRow()
+        id_registro = self.id_selecionado(table)
 
-        if current_row < 0:
+        if id_registro is None:
             QtWidgets.QMessageBox.information(self, "Aviso", "Selecione um registro para editar.")
             return
+        self.editar_registro(id_registro)
 
-        id_item = table.item(current_row, 0)
-        if not id_item:
-            QtWidgets.QMessageBox.information(self, "Aviso", "Selecione um registro válido.")
-            return
-
+    def editar_registro(self, id_registro):
         try:
-            id_registro = int(id_item.text())
-            registro = self.db.buscar_por_id(id_registro)
+            registro = self.consultas.buscar_por_id(id_registro)
             if not registro:
                 QtWidgets.QMessageBox.warning(self, "Aviso", "Registro não encontrado.")
                 return
@@ -1903,10 +2728,10 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
                 return
 
             # Atualiza o registro selecionado
-            self.db.atualizar(id_registro, dados)
+            novo = self.db.atualizar(id_registro, dados)
 
             # Atualiza a interface SEMPRE (evita impressão de que não salvou)
-            self.load_data()
+            self.aplicar_registro(registro, novo)
             self.statusBar().showMessage("Registro atualizado com sucesso!")
             self.session_dirty = True
 
@@ -1923,17 +2748,11 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
                 )
                 if resp == QtWidgets.QMessageBox.Yes:
                     try:
-                        with get_conn(DB_FILE) as conn:
-                            conn.execute("BEGIN IMMEDIATE;")
-                            conn.execute(
-                                """
-                                UPDATE registros
-                                SET cotista=?, contato=?
-                                WHERE id <> ? AND cotista=? AND contato=?
-                                """,
-                                (cotista_editado, contato_editado, id_registro, cotista_antigo, contato_antigo)
-                            )
-                            conn.commit()
+                        self.db.sincronizar_cotista(
+                            id_registro, cotista_editado, contato_editado, cotista_antigo, contato_antigo
+                        )
+                        # Várias linhas mudaram: recarga completa
+                        self.load_data()
                         self.statusBar().showMessage("Registro atualizado e sincronizado com outros iguais!")
                     except Exception as e:
                         QtWidgets.QMessageBox.warning(self, "Aviso", f"Falha ao sincronizar registros iguais:\n{str(e)}")
@@ -1950,22 +2769,12 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
             return
 
         table = self.get_current_table()
-        current_row = table.currentRow()
-        if current_row < 0:
+        current_row = table.currentIndex().row()
+        id_registro = self.id_selecionado(table)
+        if id_registro is None:
             QtWidgets.QMessageBox.information(self, "Aviso", "Selecione um registro para excluir.")
             return
 
-        id_item = table.item(current_row, 0)
-        if not id_item:
-            QtWidgets.QMessageBox.information(self, "Aviso", "Selecione um registro válido.")
-            return
-
-        try:
-            id_registro = int(id_item.text())
-        except Exception:
-            QtWidgets.QMessageBox.warning(self, "Aviso", "ID inválido.")
-            return
-
         resp = QtWidgets.QMessageBox.question(
             self,
             "Confirmar exclusão",
@@ -1981,7 +2790,7 @@ Urgentes (7 dias): {(proximos_7_dias/futuras*100) if futuras > 0 else 0:.1f}% da
             QtWidgets.QMessageBox.warning(self, "Aviso", "Registro não encontrado ou falha ao excluir.")
             return
 
-        table.removeRow(current_row)
+        table.model().remover_linha(current_row)
         self.statusBar().showMessage(f"Registro {id_registro} excluído.")
         self.session_dirty = True
 